@@ -0,0 +1,96 @@
+from fastapi import APIRouter, Query
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from datetime import datetime, timezone
+
+from models.logs_model import LogEntry, LogsResponse
+from services.logs_logic import export_logs, EXPORT_MEDIA_TYPES
+from data.async_database import get_logs
+from data.database import encode_log_cursor
+
+
+router = APIRouter()
+
+# Upper bound on a single page of logs
+MAX_LOGS_PAGE_SIZE = 1000
+
+def to_utc_naive(value: Optional[datetime]) -> Optional[datetime]:
+    """
+    Timestamps are stored as naive UTC; normalize timezone-aware filters.
+    """
+    if value and value.tzinfo:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+@router.get("/logs", response_model=LogsResponse)
+async def logs_endpoint(
+    startDate: Optional[datetime] = Query(None, description="Only logs at or after this ISO timestamp"),
+    endDate: Optional[datetime] = Query(None, description="Only logs at or before this ISO timestamp"),
+    itemId: Optional[str] = Query(None, description="Filter by item ID"),
+    userId: Optional[str] = Query(None, description="Filter by user ID"),
+    actionType: Optional[str] = Query(None, description="Filter by action type"),
+    after: Optional[str] = Query(None, description="Cursor returned as nextCursor by the previous page"),
+    limit: int = Query(100, ge=1, le=MAX_LOGS_PAGE_SIZE, description="Maximum number of logs to return")
+):
+    """
+    Get activity logs, newest first, one page at a time.
+    """
+    try:
+        logs = await get_logs(
+            start_date=to_utc_naive(startDate),
+            end_date=to_utc_naive(endDate),
+            item_id=itemId,
+            user_id=userId,
+            action_type=actionType,
+            after=after,
+            limit=limit
+        )
+    except ValueError as e:
+        return LogsResponse(success=False, message=str(e))
+    
+    return LogsResponse(
+        success=True,
+        logs=[
+            LogEntry(
+                id=log["id"],
+                timestamp=log["timestamp"],
+                userId=log["user_id"],
+                actionType=log["action_type"],
+                itemId=log["item_id"],
+                itemName=log["item_name"],
+                details=log["details"]
+            )
+            for log in logs
+        ],
+        nextCursor=encode_log_cursor(logs[-1]) if len(logs) == limit else None
+    )
+
+@router.get("/logs/export")
+async def export_logs_endpoint(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="Export format: 'ndjson' or 'csv'"),
+    gzip: bool = Query(False, description="Gzip-compress the export"),
+    startDate: Optional[datetime] = Query(None, description="Only logs at or after this ISO timestamp"),
+    endDate: Optional[datetime] = Query(None, description="Only logs at or before this ISO timestamp"),
+    itemId: Optional[str] = Query(None, description="Filter by item ID"),
+    userId: Optional[str] = Query(None, description="Filter by user ID"),
+    actionType: Optional[str] = Query(None, description="Filter by action type")
+):
+    """
+    Stream all matching logs, newest first, as NDJSON or CSV.
+    """
+    filename = f"logs.{format}" + (".gz" if gzip else "")
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    
+    return StreamingResponse(
+        export_logs(
+            format,
+            compress=gzip,
+            start_date=to_utc_naive(startDate),
+            end_date=to_utc_naive(endDate),
+            item_id=itemId,
+            user_id=userId,
+            action_type=actionType
+        ),
+        media_type="application/gzip" if gzip else EXPORT_MEDIA_TYPES[format],
+        headers=headers
+    )
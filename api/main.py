@@ -9,6 +9,9 @@ from api.placement import router as placement_router
 from api.rearrange import router as rearrange_router
 from api.import_export import router as import_export_router
 from api.logs import router as logs_router
+from data.database import flush_action_logs, start_name_index, start_waste_tracker
+from data.async_database import shutdown_db_executor
+from services.placement_logic import save_snapshot
 
 
 # Create FastAPI app
@@ -36,6 +39,22 @@ app.include_router(rearrange_router, prefix="/api", tags=["Rearrangement"])
 app.include_router(import_export_router, prefix="/api", tags=["Import/Export"])
 app.include_router(logs_router, prefix="/api", tags=["Logs"])
 
+@app.on_event("startup")
+def startup_event():
+    # Load item names into the typo-tolerant search index and expiry dates
+    # into the waste tracker without delaying startup
+    start_name_index()
+    start_waste_tracker()
+
+@app.on_event("shutdown")
+def shutdown_event():
+    # Let in-flight database work finish, then write out any action logs
+    # still buffered by the group-commit writer, and fold the placement
+    # journal into a snapshot so the next start replays little
+    shutdown_db_executor()
+    flush_action_logs()
+    save_snapshot()
+
 @app.get("/")
 async def root():
     return {
@@ -1,20 +1,29 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Query
 from typing import Optional
-from sqlalchemy.orm import Session
 
 from models.search_model import (
     SearchResponse, 
     RetrieveRequest, 
     RetrieveResponse, 
     PlaceRequest, 
-    PlaceResponse
+    PlaceResponse,
+    RegionSearchRequest,
+    RegionSearchResponse,
+    SearchCacheStatsResponse,
+    BatchSearchRequest,
+    BatchSearchResponse,
+    NameIndexStatsResponse
 )
 from services.search_logic import (
     search_item, 
     retrieve_item, 
-    place_item
+    place_item,
+    search_region,
+    search_items_batch
 )
-from data.database import get_db
+from services.search_cache import search_cache
+from data.async_database import run_db
+from data.database import name_index
 
 
 router = APIRouter()
@@ -23,8 +32,7 @@ router = APIRouter()
 async def search_endpoint(
     itemId: Optional[str] = Query(None, description="Unique identifier of the item"),
     itemName: Optional[str] = Query(None, description="Name of the item to search"),
-    userId: Optional[str] = Query(None, description="ID of the user performing the search"),
-    db: Session = Depends(get_db)
+    userId: Optional[str] = Query(None, description="ID of the user performing the search")
 ):
     """
     Search for an item by ID or name and get retrieval instructions.
@@ -37,26 +45,63 @@ async def search_endpoint(
             message="Either itemId or itemName must be provided"
         )
     
-    return search_item(db, itemId, itemName, userId)
+    return await run_db(search_item, itemId, itemName, userId)
+
+@router.post("/search/batch", response_model=BatchSearchResponse)
+async def search_batch_endpoint(
+    request: BatchSearchRequest
+):
+    """
+    Search for many items by ID and/or name in one request.
+    Results come back in request order, IDs first, then names.
+    """
+    if not request.itemIds and not request.itemNames:
+        return BatchSearchResponse(
+            success=False,
+            message="At least one itemId or itemName must be provided"
+        )
+    
+    return await run_db(search_items_batch, request)
+
+@router.get("/search/cache/stats", response_model=SearchCacheStatsResponse)
+async def search_cache_stats_endpoint():
+    """
+    Hit rate, eviction and invalidation counters of this worker's search cache.
+    """
+    return SearchCacheStatsResponse(success=True, **search_cache.stats())
+
+@router.get("/search/name-index/stats", response_model=NameIndexStatsResponse)
+def name_index_stats_endpoint():
+    """
+    Size and approximate memory footprint of the typo-tolerant name index.
+    """
+    return NameIndexStatsResponse(success=True, **name_index.stats())
+
+@router.post("/search/region", response_model=RegionSearchResponse)
+async def search_region_endpoint(
+    request: RegionSearchRequest
+):
+    """
+    List the items in a container that intersect the given box.
+    """
+    return await run_db(search_region, request)
 
 @router.post("/retrieve", response_model=RetrieveResponse)
 async def retrieve_endpoint(
-    request: RetrieveRequest,
-    db: Session = Depends(get_db)
+    request: RetrieveRequest
 ):
     """
     Log that an item has been retrieved from storage.
     This marks the item as used once.
     """
-    return retrieve_item(db, request)
+    return await run_db(retrieve_item, request)
 
 @router.post("/place", response_model=PlaceResponse)
 async def place_endpoint(
-    request: PlaceRequest,
-    db: Session = Depends(get_db)
+    request: PlaceRequest
 ):
     """
     Log that an item has been placed back into storage.
     """
-    return place_item(db, request)
+    return await run_db(place_item, request)
 
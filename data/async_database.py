@@ -0,0 +1,69 @@
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+from data import database
+from data.database import SessionLocal, DB_POOL_SIZE, DB_MAX_OVERFLOW
+
+T = TypeVar("T")
+
+# Database work runs on its own thread pool, sized to the connection pool so
+# every worker thread can hold a connection without waiting on the pool
+DB_EXECUTOR_WORKERS = int(os.getenv("DB_EXECUTOR_WORKERS", str(DB_POOL_SIZE + DB_MAX_OVERFLOW)))
+db_executor = ThreadPoolExecutor(max_workers=DB_EXECUTOR_WORKERS, thread_name_prefix="db")
+
+def _call_with_session(func: Callable[..., T], args: tuple, kwargs: dict) -> T:
+    db = SessionLocal()
+    try:
+        return func(db, *args, **kwargs)
+    finally:
+        db.close()
+
+async def run_db(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Run `func(db, *args, **kwargs)` on the database thread pool with a
+    session of its own, so the event loop keeps serving other requests.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        db_executor,
+        functools.partial(_call_with_session, func, args, kwargs)
+    )
+
+def to_async(func: Callable[..., T]) -> Callable[..., Any]:
+    """
+    Wrap a `func(db, ...)` database operation as a coroutine that takes
+    the same arguments minus the session.
+    """
+    @functools.wraps(func)
+    async def wrapper(*args: Any, **kwargs: Any) -> T:
+        return await run_db(func, *args, **kwargs)
+    return wrapper
+
+def shutdown_db_executor() -> None:
+    """
+    Wait for in-flight database work and stop the thread pool.
+    """
+    db_executor.shutdown(wait=True)
+
+# Async variants of the data/database.py operations
+get_item_by_id = to_async(database.get_item_by_id)
+get_item_by_name = to_async(database.get_item_by_name)
+get_items_by_name = to_async(database.get_items_by_name)
+get_all_items = to_async(database.get_all_items)
+get_waste_items = to_async(database.get_waste_items)
+get_items_expiring = to_async(database.get_items_expiring)
+create_item = to_async(database.create_item)
+update_item_position = to_async(database.update_item_position)
+update_item_usage = to_async(database.update_item_usage)
+remove_items_from_inventory = to_async(database.remove_items_from_inventory)
+undock_container_items = to_async(database.undock_container_items)
+get_container_by_id = to_async(database.get_container_by_id)
+get_all_containers = to_async(database.get_all_containers)
+create_container = to_async(database.create_container)
+get_items_by_container = to_async(database.get_items_by_container)
+get_items_in_region = to_async(database.get_items_in_region)
+log_action = to_async(database.log_action)
+get_logs = to_async(database.get_logs)
@@ -0,0 +1,60 @@
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+class ContainerCache:
+    """
+    In-process cache of container metadata.
+    Containers are loaded once and reloaded only when the shared inventory
+    version changes. The version row is re-read at most every
+    `check_interval_ms`, so changes made by other workers are picked up
+    without a query per lookup.
+    """
+
+    def __init__(
+        self,
+        load_containers: Callable[[Any], List[Dict[str, Any]]],
+        load_version: Callable[[Any], int],
+        check_interval_ms: int = 1000
+    ):
+        self.load_containers = load_containers
+        self.load_version = load_version
+        self.check_interval = check_interval_ms / 1000
+        self._containers: Optional[Dict[str, Dict[str, Any]]] = None
+        self._version: Optional[int] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, db, container_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a container by its ID.
+        """
+        return self._fresh(db).get(container_id)
+
+    def all(self, db) -> List[Dict[str, Any]]:
+        """
+        Get all containers.
+        """
+        return list(self._fresh(db).values())
+
+    def invalidate(self) -> None:
+        """
+        Force a reload on the next lookup.
+        """
+        self._containers = None
+
+    def _fresh(self, db) -> Dict[str, Dict[str, Any]]:
+        containers = self._containers
+        if containers is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return containers
+
+        with self._lock:
+            version = self.load_version(db)
+            if self._containers is None or version != self._version:
+                self._containers = {
+                    container["id"]: container
+                    for container in self.load_containers(db)
+                }
+                self._version = version
+            self._checked_at = time.monotonic()
+            return self._containers
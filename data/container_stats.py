@@ -0,0 +1,119 @@
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Per-container aggregates (item count, used volume, used weight, earliest
+# expiry) kept in container_stats by triggers, so every write to items
+# (create_item, update_item_position, removals, batch placement, imports)
+# updates them in its own transaction and capacity reads are a primary key
+# lookup. `version` changes with every write, so per-container caches (see
+# services/retrieval_cost.py) know when to rebuild. Only the earliest expiry
+# needs a recount, and only when the item holding it leaves;
+# ix_items_container_expiry makes that a single seek.
+ITEM_VOLUME = """coalesce(
+    (json_extract({row}.position, '$.end.width') - json_extract({row}.position, '$.start.width')) *
+    (json_extract({row}.position, '$.end.depth') - json_extract({row}.position, '$.start.depth')) *
+    (json_extract({row}.position, '$.end.height') - json_extract({row}.position, '$.start.height')),
+    0)"""
+
+ADD_ITEM = """
+    INSERT OR IGNORE INTO container_stats(container_id, item_count, used_volume, used_weight, version)
+        SELECT new.container_id, 0, 0, 0, 0 WHERE new.container_id IS NOT NULL;
+    UPDATE container_stats SET
+        item_count = item_count + 1,
+        version = version + 1,
+        used_volume = used_volume + {volume},
+        used_weight = used_weight + coalesce(new.weight, 0),
+        earliest_expiry = CASE
+            WHEN earliest_expiry IS NULL OR new.expiry_date < earliest_expiry THEN coalesce(new.expiry_date, earliest_expiry)
+            ELSE earliest_expiry
+        END
+    WHERE container_id = new.container_id;
+""".format(volume=ITEM_VOLUME.format(row="new"))
+
+REMOVE_ITEM = """
+    UPDATE container_stats SET
+        item_count = item_count - 1,
+        version = version + 1,
+        -- Reset an emptied container so float rounding does not accumulate
+        used_volume = CASE WHEN item_count = 1 THEN 0 ELSE used_volume - {volume} END,
+        used_weight = CASE WHEN item_count = 1 THEN 0 ELSE used_weight - coalesce(old.weight, 0) END,
+        earliest_expiry = CASE
+            WHEN old.expiry_date IS NOT NULL AND old.expiry_date <= earliest_expiry THEN (
+                SELECT min(expiry_date) FROM items
+                WHERE container_id = old.container_id AND expiry_date IS NOT NULL
+            )
+            ELSE earliest_expiry
+        END
+    WHERE container_id = old.container_id;
+""".format(volume=ITEM_VOLUME.format(row="old"))
+
+CONTAINER_STATS_DDL = [
+    """
+    CREATE TRIGGER IF NOT EXISTS container_stats_insert AFTER INSERT ON items
+    WHEN new.container_id IS NOT NULL BEGIN
+    """ + ADD_ITEM + """
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS container_stats_update
+    AFTER UPDATE OF container_id, position, weight, expiry_date ON items BEGIN
+    """ + REMOVE_ITEM + ADD_ITEM + """
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS container_stats_delete AFTER DELETE ON items
+    WHEN old.container_id IS NOT NULL BEGIN
+    """ + REMOVE_ITEM + """
+    END
+    """
+]
+
+CONTAINER_STATS_TRIGGERS = ("container_stats_insert", "container_stats_update", "container_stats_delete")
+
+CONTAINER_STATS_BACKFILL = [
+    "DELETE FROM container_stats",
+    """
+    INSERT INTO container_stats(container_id, item_count, used_volume, used_weight, earliest_expiry, version)
+    SELECT container_id, count(*), sum({volume}), sum(coalesce(weight, 0)), min(expiry_date), 0
+    FROM items
+    WHERE container_id IS NOT NULL
+    GROUP BY container_id
+    """.format(volume=ITEM_VOLUME.format(row="items"))
+]
+
+def setup_container_stats(engine: Engine) -> bool:
+    """
+    Create the triggers maintaining container_stats if they are missing.
+    Returns False when the database is not SQLite or lacks JSON1 support.
+    """
+    if engine.dialect.name != "sqlite":
+        return False
+
+    try:
+        with engine.begin() as connection:
+            existed = connection.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'container_stats_insert'")
+            ).first() is not None
+
+            for statement in CONTAINER_STATS_DDL:
+                connection.execute(text(statement))
+
+            if not existed:
+                # Count items stored before the triggers existed
+                for statement in CONTAINER_STATS_BACKFILL:
+                    connection.execute(text(statement))
+    except Exception:
+        # SQLite build without JSON1, or an items table from an older schema.
+        # SQLite creates triggers without checking their columns, so drop them
+        # rather than leave items writes failing
+        with engine.begin() as connection:
+            for name in CONTAINER_STATS_TRIGGERS:
+                connection.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+        logger.warning("Container aggregates unavailable; computing them from items instead")
+        return False
+
+    return True
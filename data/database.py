@@ -1,15 +1,97 @@
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, JSON, ForeignKey, Float
+import base64
+import logging
+import os
+from collections import Counter
+from sqlalchemy import create_engine, event, insert, select, update, delete, text, and_, or_, literal, union_all, func, case, column, Column, Index, Integer, String, DateTime, JSON, ForeignKey, Float
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from typing import Dict, Iterator, List, Any, Mapping, Optional, Tuple
+from dotenv import load_dotenv
 
-# Database connection
-DATABASE_URL = "sqlite:///./inventory.db"
-engine = create_engine(DATABASE_URL)
+from data.log_writer import ActionLogWriter
+from data.name_search import setup_name_search, build_match_query
+from data.spatial_index import setup_spatial_index
+from data.container_stats import setup_container_stats
+from data.container_cache import ContainerCache
+from data.trigram_index import TrigramIndex
+from data.waste_tracker import WasteTracker
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Database connection settings (overridable through the environment / .env)
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./inventory.db")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", str(64 * 1024)))
+
+# Action log group-commit settings
+ACTION_LOG_SYNCHRONOUS = os.getenv("ACTION_LOG_SYNCHRONOUS", "false").lower() in ("1", "true", "yes")
+ACTION_LOG_BATCH_SIZE = int(os.getenv("ACTION_LOG_BATCH_SIZE", "500"))
+ACTION_LOG_FLUSH_INTERVAL_MS = int(os.getenv("ACTION_LOG_FLUSH_INTERVAL_MS", "50"))
+ACTION_LOG_QUEUE_SIZE = int(os.getenv("ACTION_LOG_QUEUE_SIZE", "10000"))
+
+def create_db_engine(database_url: str = DATABASE_URL) -> Engine:
+    """
+    Create the application engine.
+    SQLite file databases get WAL journaling and tuned pragmas so that
+    readers are not blocked by a concurrent writer.
+    """
+    if not database_url.startswith("sqlite"):
+        return create_engine(
+            database_url,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_pre_ping=True
+        )
+
+    in_memory = database_url in ("sqlite://", "sqlite:///:memory:")
+    pool_options = {} if in_memory else {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT
+    }
+    sqlite_engine = create_engine(
+        database_url,
+        connect_args={
+            "check_same_thread": False,
+            "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000
+        },
+        **pool_options
+    )
+
+    @event.listens_for(sqlite_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if not in_memory:
+            cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        # Negative cache_size is expressed in KiB rather than pages
+        cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.close()
+
+    return sqlite_engine
+
+engine = create_db_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# An item is used up once it reaches its max uses. Kept as literal SQL so the
+# waste query repeats the partial index predicate verbatim, which SQLite
+# requires before it will use that index.
+DEPLETED_PREDICATE = "usage_count >= max_uses AND max_uses > 0"
+
 # Database models
 class Item(Base):
     __tablename__ = "items"
@@ -19,10 +101,18 @@ class Item(Base):
     container_id = Column(String, index=True)
     zone = Column(String)
     position = Column(JSON)  # Stores the position as JSON
-    expiry_date = Column(DateTime, nullable=True)
+    expiry_date = Column(DateTime, nullable=True, index=True)
     usage_count = Column(Integer, default=0)
     max_uses = Column(Integer, nullable=True)
     weight = Column(Float, default=0.0)
+    
+    # Partial index holding only used-up items, so the depletion half of the
+    # waste predicate reads just the depleted rows
+    __table_args__ = (
+        Index("ix_items_depleted", "id", sqlite_where=text(DEPLETED_PREDICATE)),
+        # Earliest expiry per container, for container_stats recounts
+        Index("ix_items_container_expiry", "container_id", "expiry_date"),
+    )
 
 class Container(Base):
     __tablename__ = "containers"
@@ -33,6 +123,41 @@ class Container(Base):
     dimensions = Column(JSON)  # width, depth, height
     max_weight = Column(Float, default=0.0)
 
+class ContainerStats(Base):
+    __tablename__ = "container_stats"
+    
+    # Aggregates over the items in a container, maintained by triggers (see data/container_stats.py)
+    container_id = Column(String, primary_key=True)
+    item_count = Column(Integer, nullable=False, default=0)
+    used_volume = Column(Float, nullable=False, default=0.0)
+    used_weight = Column(Float, nullable=False, default=0.0)
+    earliest_expiry = Column(DateTime, nullable=True)
+    version = Column(Integer, nullable=False, default=0)  # bumped on every change to the container's items
+
+class UndockedItem(Base):
+    __tablename__ = "undocked_items"
+    
+    # Items that left the station with an undocking container, as they were when
+    # removed; an item ID can come back and leave again, so it is not the key
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    item_id = Column(String, index=True)
+    name = Column(String)
+    container_id = Column(String, index=True)
+    zone = Column(String)
+    position = Column(JSON)
+    expiry_date = Column(DateTime, nullable=True)
+    usage_count = Column(Integer, default=0)
+    max_uses = Column(Integer, nullable=True)
+    weight = Column(Float, default=0.0)
+    undocked_at = Column(DateTime, index=True)
+
+class InventoryVersion(Base):
+    __tablename__ = "inventory_version"
+    
+    # Single row whose version is bumped whenever cached inventory metadata changes
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
 class ActionLog(Base):
     __tablename__ = "action_logs"
     
@@ -43,10 +168,75 @@ class ActionLog(Base):
     item_name = Column(String, nullable=True)
     timestamp = Column(DateTime, default=datetime.utcnow)
     details = Column(JSON, nullable=True)  # Additional details as JSON
+    
+    # Composite indexes matching the /logs filter combinations; every one ends
+    # in (timestamp, id) so the newest-first keyset scan never needs a sort
+    __table_args__ = (
+        Index("ix_action_logs_timestamp_id", "timestamp", "id"),
+        Index("ix_action_logs_item_timestamp", "item_id", "timestamp", "id"),
+        Index("ix_action_logs_user_timestamp", "user_id", "timestamp", "id"),
+        Index("ix_action_logs_action_timestamp", "action_type", "timestamp", "id"),
+    )
 
 # Create tables
 Base.metadata.create_all(bind=engine)
 
+with engine.begin() as connection:
+    if connection.execute(select(InventoryVersion.id)).first() is None:
+        connection.execute(insert(InventoryVersion).values(id=1, version=0))
+
+def ensure_indexes() -> None:
+    """
+    Create indexes declared on the models that are missing from an existing database.
+    create_all only creates indexes together with new tables.
+    """
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            try:
+                index.create(bind=engine, checkfirst=True)
+            except OperationalError:
+                # Databases created by older schemas may lack indexed columns
+                logger.warning("Could not create index %s on %s", index.name, table.name)
+
+ensure_indexes()
+
+# Full-text index over item names (SQLite FTS5); LIKE is used when unavailable
+NAME_SEARCH_ENABLED = setup_name_search(engine)
+
+# Maximum number of items returned by a name search
+NAME_SEARCH_LIMIT = int(os.getenv("NAME_SEARCH_LIMIT", "50"))
+
+# Names searched per statement by search_items_by_names (SQLite allows 500 compound terms)
+NAME_SEARCH_BATCH_TERMS = 200
+
+# Typo-tolerant fallback for names neither the index nor substring matching find;
+# filled in the background by start_name_index() and kept current by item writes
+NAME_SIMILARITY_THRESHOLD = float(os.getenv("NAME_SIMILARITY_THRESHOLD", "0.3"))
+name_index = TrigramIndex(NAME_SIMILARITY_THRESHOLD)
+
+# Expiry heap answering upcoming-expiry lookups without a range scan; filled
+# in the background by start_waste_tracker() and kept current by item writes
+waste_tracker = WasteTracker()
+
+# R*Tree over item positions (SQLite); region queries scan the container otherwise
+SPATIAL_INDEX_ENABLED = setup_spatial_index(engine)
+
+# Trigger-maintained container aggregates (SQLite); computed from items otherwise
+CONTAINER_STATS_ENABLED = setup_container_stats(engine)
+
+# How often each worker re-checks the inventory version for container changes
+CONTAINER_CACHE_CHECK_INTERVAL_MS = int(os.getenv("CONTAINER_CACHE_CHECK_INTERVAL_MS", "1000"))
+
+# Buffered writer for action logs (see log_action)
+action_log_writer = ActionLogWriter(
+    SessionLocal,
+    ActionLog,
+    batch_size=ACTION_LOG_BATCH_SIZE,
+    flush_interval_ms=ACTION_LOG_FLUSH_INTERVAL_MS,
+    max_queue_size=ACTION_LOG_QUEUE_SIZE,
+    synchronous=ACTION_LOG_SYNCHRONOUS
+)
+
 # Database dependency
 def get_db():
     db = SessionLocal()
@@ -55,109 +245,331 @@ def get_db():
     finally:
         db.close()
 
+# Column projections for the lightweight read path.
+# Reads select only these columns through Core and hand back read-only row
+# mappings (row["id"], row.get("expiry_date")), so no ORM instance or dict
+# copy is allocated per row.
+ITEM_COLUMNS = (
+    Item.id,
+    Item.name,
+    Item.container_id,
+    Item.zone,
+    Item.position,
+    Item.expiry_date,
+    Item.usage_count,
+    Item.max_uses,
+    Item.weight
+)
+
+# What usage simulations read: no position to decode
+ITEM_USAGE_COLUMNS = (
+    Item.id,
+    Item.name,
+    Item.expiry_date,
+    Item.usage_count,
+    Item.max_uses
+)
+
+# What batch placement needs to know about items already in inventory
+ITEM_PLACEMENT_COLUMNS = (
+    Item.id,
+    Item.name,
+    Item.weight
+)
+
+CONTAINER_COLUMNS = (
+    Container.id,
+    Container.name,
+    Container.zone,
+    Container.dimensions,
+    Container.max_weight
+)
+
+CONTAINER_STATS_COLUMNS = (
+    ContainerStats.item_count,
+    ContainerStats.used_volume,
+    ContainerStats.used_weight,
+    ContainerStats.earliest_expiry
+)
+
+ITEM_DEFAULTS = {column.key: column.default.arg if column.default is not None else None for column in ITEM_COLUMNS}
+
+# Number of rows fetched per round-trip when streaming large scans
+STREAM_BATCH_SIZE = 1000
+
+def fetch_one(db: Session, columns, *criteria) -> Optional[Mapping[str, Any]]:
+    """
+    Fetch the first row matching the criteria as a read-only mapping.
+    """
+    return db.execute(select(*columns).where(*criteria).limit(1)).mappings().first()
+
+def fetch_all(db: Session, columns, *criteria) -> List[Mapping[str, Any]]:
+    """
+    Fetch all rows matching the criteria as read-only mappings.
+    """
+    return db.execute(select(*columns).where(*criteria)).mappings().all()
+
+def stream_rows(db: Session, columns, *criteria, batch_size: int = STREAM_BATCH_SIZE) -> Iterator[Mapping[str, Any]]:
+    """
+    Stream rows matching the criteria in batches of `batch_size`
+    without materializing the whole result.
+    """
+    statement = select(*columns).where(*criteria).execution_options(yield_per=batch_size)
+    yield from db.execute(statement).mappings()
+
 # Database operations for items
-def get_item_by_id(db: Session, item_id: str) -> Optional[Dict[str, Any]]:
+def get_item_by_id(db: Session, item_id: str) -> Optional[Mapping[str, Any]]:
     """
     Get an item by its ID.
     """
-    item = db.query(Item).filter(Item.id == item_id).first()
-    if not item:
-        return None
-    
-    return {
-        "id": item.id,
-        "name": item.name,
-        "container_id": item.container_id,
-        "zone": item.zone,
-        "position": item.position,
-        "expiry_date": item.expiry_date,
-        "usage_count": item.usage_count,
-        "max_uses": item.max_uses,
-        "weight": item.weight
-    }
+    return fetch_one(db, ITEM_COLUMNS, Item.id == item_id)
 
-def get_item_by_name(db: Session, item_name: str) -> Optional[Dict[str, Any]]:
+def get_item_by_name(db: Session, item_name: str) -> Optional[Mapping[str, Any]]:
     """
     Get a single item by exact name.
     """
-    item = db.query(Item).filter(Item.name == item_name).first()
-    if not item:
-        return None
-    
-    return {
-        "id": item.id,
-        "name": item.name,
-        "container_id": item.container_id,
-        "zone": item.zone,
-        "position": item.position,
-        "expiry_date": item.expiry_date,
-        "usage_count": item.usage_count,
-        "max_uses": item.max_uses,
-        "weight": item.weight
-    }
+    return fetch_one(db, ITEM_COLUMNS, Item.name == item_name)
+
+def get_items_by_ids(db: Session, item_ids: List[str], columns=ITEM_COLUMNS) -> Dict[str, Mapping[str, Any]]:
+    """
+    Get several items by ID in one query, keyed by ID; unknown IDs are left out.
+    """
+    unique_ids = list(set(item_ids))
+    found = {}
+    # Chunked to stay under SQLite's bound parameter limit
+    for offset in range(0, len(unique_ids), STREAM_BATCH_SIZE):
+        chunk = unique_ids[offset:offset + STREAM_BATCH_SIZE]
+        found.update((item["id"], item) for item in fetch_all(db, columns, Item.id.in_(chunk)))
+    return found
+
+def get_items_by_exact_names(db: Session, item_names: List[str], columns=ITEM_COLUMNS) -> Dict[str, Mapping[str, Any]]:
+    """
+    Get one item per exact name, like get_item_by_name, keyed by name;
+    unknown names are left out.
+    """
+    unique_names = list(set(item_names))
+    found = {}
+    for offset in range(0, len(unique_names), STREAM_BATCH_SIZE):
+        chunk = unique_names[offset:offset + STREAM_BATCH_SIZE]
+        for item in fetch_all(db, columns, Item.name.in_(chunk)):
+            found.setdefault(item["name"], item)
+    return found
 
-def get_items_by_name(db: Session, item_name: str) -> List[Dict[str, Any]]:
+def get_items_by_name(db: Session, item_name: str, limit: int = NAME_SEARCH_LIMIT) -> List[Mapping[str, Any]]:
     """
     Get items by name (can return multiple items).
+    Whole-token and prefix matches come from the full-text index, best match
+    first; plain substring matching is only used when that finds nothing.
     """
-    items = db.query(Item).filter(Item.name.like(f"%{item_name}%")).all()
+    items = search_items_by_name(db, item_name, limit)
+    if items:
+        return items
     
-    return [
-        {
-            "id": item.id,
-            "name": item.name,
-            "container_id": item.container_id,
-            "zone": item.zone,
-            "position": item.position,
-            "expiry_date": item.expiry_date,
-            "usage_count": item.usage_count,
-            "max_uses": item.max_uses,
-            "weight": item.weight
-        }
-        for item in items
-    ]
+    return match_items_by_substring(db, item_name, limit) or match_items_by_similarity(db, item_name, limit)
+
+def match_items_by_similarity(db: Session, item_name: str, limit: int = NAME_SEARCH_LIMIT) -> List[Mapping[str, Any]]:
+    """
+    Items whose names are closest to a possibly misspelled name, most similar first.
+    """
+    matches = name_index.search(item_name, limit)
+    if not matches:
+        return []
+    
+    ranks = {name: rank for rank, (name, _) in enumerate(matches)}
+    statement = (
+        select(*ITEM_COLUMNS)
+        .where(Item.name.in_(ranks))
+        .order_by(case(ranks, value=Item.name))
+        .limit(limit)
+    )
+    return db.execute(statement).mappings().all()
+
+def match_items_by_substring(db: Session, item_name: str, limit: int = NAME_SEARCH_LIMIT) -> List[Mapping[str, Any]]:
+    """
+    Unranked substring name match (LIKE), the fallback for names the index cannot find.
+    """
+    statement = select(*ITEM_COLUMNS).where(Item.name.like(f"%{item_name}%")).limit(limit)
+    return db.execute(statement).mappings().all()
+
+def search_items_by_name(db: Session, item_name: str, limit: int = NAME_SEARCH_LIMIT) -> List[Mapping[str, Any]]:
+    """
+    Ranked token/prefix name search over the FTS5 index.
+    """
+    match_query = build_match_query(item_name)
+    if not NAME_SEARCH_ENABLED or not match_query:
+        return []
+    
+    columns = ", ".join(f"items.{column.key}" for column in ITEM_COLUMNS)
+    statement = text(
+        f"SELECT {columns} FROM items_fts "
+        "JOIN items_fts_keys AS keys ON keys.fts_key = items_fts.rowid "
+        "JOIN items ON items.id = keys.item_id "
+        "WHERE items_fts MATCH :query ORDER BY items_fts.rank LIMIT :limit"
+    ).columns(*ITEM_COLUMNS)
+    
+    return db.execute(statement, {"query": match_query, "limit": limit}).mappings().all()
+
+def get_items_by_names(
+    db: Session,
+    item_names: List[str],
+    limit: int = NAME_SEARCH_LIMIT
+) -> Dict[str, List[Mapping[str, Any]]]:
+    """
+    Get items for several names at once, keyed by name, with the same
+    matching as get_items_by_name. All names go to the full-text index in
+    one statement; substring matching runs only for names it found nothing for.
+    """
+    found = search_items_by_names(db, item_names, limit)
+    for item_name in item_names:
+        if not found.get(item_name):
+            found[item_name] = (
+                match_items_by_substring(db, item_name, limit) or
+                match_items_by_similarity(db, item_name, limit)
+            )
+    return found
+
+def search_items_by_names(
+    db: Session,
+    item_names: List[str],
+    limit: int = NAME_SEARCH_LIMIT
+) -> Dict[str, List[Mapping[str, Any]]]:
+    """
+    Ranked name search for several names in one statement: each name's
+    top `limit` matches, tagged with the name's position in the query.
+    """
+    match_queries = {}
+    for item_name in dict.fromkeys(item_names):
+        match_query = build_match_query(item_name)
+        if match_query:
+            match_queries[item_name] = match_query
+    if not NAME_SEARCH_ENABLED or not match_queries:
+        return {}
+    
+    columns = ", ".join(f"items.{column.key}" for column in ITEM_COLUMNS)
+    names = list(match_queries)
+    found: Dict[str, List[Mapping[str, Any]]] = {name: [] for name in names}
+    # Chunked to stay under SQLite's limit on terms in a compound SELECT
+    for offset in range(0, len(names), NAME_SEARCH_BATCH_TERMS):
+        chunk = names[offset:offset + NAME_SEARCH_BATCH_TERMS]
+        branches = [
+            f"SELECT * FROM (SELECT {index} AS query_index, {columns} "
+            "FROM items_fts JOIN items_fts_keys AS keys ON keys.fts_key = items_fts.rowid "
+            "JOIN items ON items.id = keys.item_id "
+            f"WHERE items_fts MATCH :query_{index} ORDER BY items_fts.rank LIMIT :limit)"
+            for index in range(len(chunk))
+        ]
+        statement = text(" UNION ALL ".join(branches)).columns(column("query_index", Integer), *ITEM_COLUMNS)
+        parameters = {f"query_{index}": match_queries[name] for index, name in enumerate(chunk)}
+        for row in db.execute(statement, {**parameters, "limit": limit}).mappings():
+            found[chunk[row["query_index"]]].append(row)
+    return found
 
-def get_all_items(db: Session) -> List[Dict[str, Any]]:
+def start_name_index() -> None:
+    """
+    Build the typo-tolerant name index from the distinct item names in the background.
+    """
+    def load_names():
+        db = SessionLocal()
+        try:
+            statement = select(Item.name, func.count()).group_by(Item.name)
+            for batch in db.execute(statement.execution_options(yield_per=STREAM_BATCH_SIZE)).partitions():
+                yield [tuple(row) for row in batch]
+        finally:
+            db.close()
+    
+    name_index.build_in_background(load_names)
+
+def start_waste_tracker() -> None:
+    """
+    Load every item's expiry date into the waste tracker in the background.
+    """
+    def load_items():
+        db = SessionLocal()
+        try:
+            statement = select(Item.id, Item.expiry_date)
+            for batch in db.execute(statement.execution_options(yield_per=STREAM_BATCH_SIZE)).partitions():
+                yield [tuple(row) for row in batch]
+        finally:
+            db.close()
+    
+    waste_tracker.build_in_background(load_items)
+
+def get_all_items(db: Session) -> List[Mapping[str, Any]]:
     """
     Get all items from the database.
     """
-    items = db.query(Item).all()
+    return fetch_all(db, ITEM_COLUMNS)
+
+def iter_all_items(db: Session, batch_size: int = STREAM_BATCH_SIZE) -> Iterator[Mapping[str, Any]]:
+    """
+    Stream all items from the database in batches.
+    Use this instead of get_all_items for full-inventory scans.
+    """
+    return stream_rows(db, ITEM_COLUMNS, batch_size=batch_size)
+
+def get_waste_items(db: Session, current_date: datetime) -> List[Mapping[str, Any]]:
+    """
+    Get only the items that are expired or out of uses as of `current_date`.
+    Each row carries its waste `reason` ("Expired" wins over "Out of Uses").
+    The predicate runs in SQL against the expiry and depletion indexes, so
+    writes by every worker are seen.
+    """
+    expired = Item.expiry_date < current_date
+    depleted = text(DEPLETED_PREDICATE)
     
-    return [
-        {
-            "id": item.id,
-            "name": item.name,
-            "container_id": item.container_id,
-            "zone": item.zone,
-            "position": item.position,
-            "expiry_date": item.expiry_date,
-            "usage_count": item.usage_count,
-            "max_uses": item.max_uses,
-            "weight": item.weight
-        }
-        for item in items
-    ]
+    # Two index-driven branches rather than one OR, which SQLite would scan
+    statement = union_all(
+        select(*ITEM_COLUMNS, literal("Expired").label("reason")).where(expired),
+        select(*ITEM_COLUMNS, literal("Out of Uses").label("reason")).where(
+            depleted,
+            # coalesce keeps the planner on the partial index instead of expiry_date
+            func.coalesce(Item.expiry_date, current_date) >= current_date
+        )
+    )
+    return db.execute(statement).mappings().all()
+
+def get_items_expiring(db: Session, start: datetime, end: datetime, columns=ITEM_COLUMNS) -> List[Mapping[str, Any]]:
+    """
+    Get the items expiring after `start` and no later than `end`, earliest first.
+    Once the waste tracker is loaded, the rows it names are read and
+    re-checked; they are the answer when their number matches an index-only
+    count of the range in SQL. Otherwise (another worker inserted or
+    re-dated items) the range query runs and the tracker learns its rows.
+    """
+    in_range = (Item.expiry_date > start, Item.expiry_date <= end)
+    if not any(column.key == "expiry_date" for column in columns):
+        columns = (*columns, Item.expiry_date)
+    
+    if waste_tracker.ready.is_set():
+        expiring = waste_tracker.expiring_between(start, end)
+        items = get_items_by_ids(db, [item_id for _, item_id in expiring], columns)
+        # Stored rows win over what the tracker remembers
+        waste_tracker.add_many(waste_state(item) for item in items.values())
+        found = [
+            items[item_id] for _, item_id in expiring
+            if item_id in items and items[item_id]["expiry_date"] and start < items[item_id]["expiry_date"] <= end
+        ]
+        # Every row found is in the range, so equal counts mean the same rows
+        if len(found) == db.execute(select(func.count()).select_from(Item).where(*in_range)).scalar():
+            return sorted(found, key=lambda item: (item["expiry_date"], item["id"]))
+    
+    statement = select(*columns).where(*in_range).order_by(Item.expiry_date, Item.id)
+    found = db.execute(statement).mappings().all()
+    if waste_tracker.ready.is_set():
+        waste_tracker.add_many(waste_state(item) for item in found)
+    return found
 
 def create_item(db: Session, item_data: Dict[str, Any]) -> Dict[str, Any]:
     """
     Create a new item in the database.
     """
-    item = Item(**item_data)
-    db.add(item)
+    item = {**ITEM_DEFAULTS, **item_data}
+    db.execute(insert(Item).values(**item))
     db.commit()
-    db.refresh(item)
+    name_index.add(item["name"])
+    waste_tracker.add_many([waste_state(item)])
     
-    return {
-        "id": item.id,
-        "name": item.name,
-        "container_id": item.container_id,
-        "zone": item.zone,
-        "position": item.position,
-        "expiry_date": item.expiry_date,
-        "usage_count": item.usage_count,
-        "max_uses": item.max_uses,
-        "weight": item.weight
-    }
+    return item
 
 def update_item_position(db: Session, item_id: str, container_id: str, position: Dict[str, Any]) -> None:
     """
@@ -169,6 +581,40 @@ def update_item_position(db: Session, item_id: str, container_id: str, position:
         item.position = position
         db.commit()
 
+def save_item_positions(db: Session, placements: List[Dict[str, Any]]) -> None:
+    """
+    Write many item positions in one transaction.
+    Each placement needs id, container_id and position; placements for items
+    not yet in inventory are inserted with their remaining fields.
+    """
+    if not placements:
+        return
+    
+    item_ids = [placement["id"] for placement in placements]
+    existing = set(db.execute(select(Item.id).where(Item.id.in_(item_ids))).scalars())
+    
+    updates = [
+        {"id": placement["id"], "container_id": placement["container_id"], "position": placement["position"]}
+        for placement in placements if placement["id"] in existing
+    ]
+    inserts = [
+        {**ITEM_DEFAULTS, **placement}
+        for placement in placements if placement["id"] not in existing
+    ]
+    
+    try:
+        if updates:
+            db.execute(update(Item), updates)
+        if inserts:
+            db.execute(insert(Item), inserts)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    
+    name_index.add_many(Counter(item["name"] for item in inserts).items())
+    waste_tracker.add_many(waste_state(item) for item in inserts)
+
 def update_item_usage(db: Session, item_id: str) -> None:
     """
     Increment the usage count of an item.
@@ -178,87 +624,296 @@ def update_item_usage(db: Session, item_id: str) -> None:
         item.usage_count += 1
         db.commit()
 
+def increment_item_usages(db: Session, increments: Dict[str, int]) -> None:
+    """
+    Add uses to many items in one executemany UPDATE and one transaction.
+    Non-positive increments are ignored: uses never go down.
+    """
+    increments = {item_id: uses for item_id, uses in increments.items() if uses and uses > 0}
+    if not increments:
+        return
+    
+    try:
+        # Straight to the driver: per-row parameter processing would cost
+        # more than the update itself
+        db.connection().exec_driver_sql(
+            "UPDATE items SET usage_count = usage_count + ? WHERE id = ?",
+            [(uses, item_id) for item_id, uses in increments.items()]
+        )
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
 def remove_items_from_inventory(db: Session, item_ids: List[str]) -> int:
     """
     Remove items from inventory by their IDs.
     Returns the number of items removed.
     """
+    names = db.execute(select(Item.name).where(Item.id.in_(item_ids))).scalars().all()
     count = db.query(Item).filter(Item.id.in_(item_ids)).delete(synchronize_session=False)
     db.commit()
+    for name, removed in Counter(names).items():
+        name_index.remove(name, removed)
+    waste_tracker.remove(item_ids)
     return count
 
+def undock_container_items(
+    db: Session,
+    container_id: str,
+    user_id: str = "system",
+    timestamp: Optional[str] = None
+) -> List[Mapping[str, Any]]:
+    """
+    Remove every item in a container as one transaction: the rows are
+    copied into undocked_items, each gets an "undocking" action log row,
+    and they are deleted, all as set-based statements.
+    Returns the id and name of each removed item.
+    """
+    in_container = Item.container_id == container_id
+    log_entry = build_log_entry("undocking", user_id, None, None, timestamp, {"containerId": container_id})
+    undocked_at = literal(log_entry["timestamp"], DateTime)
+    try:
+        archived = ["item_id" if column.key == "id" else column.key for column in ITEM_COLUMNS]
+        db.execute(insert(UndockedItem).from_select(
+            archived + ["undocked_at"],
+            select(*ITEM_COLUMNS, undocked_at).where(in_container)
+        ))
+        # Logged in this transaction rather than through the buffered
+        # writer, so the audit trail commits with the removal
+        db.execute(insert(ActionLog).from_select(
+            ["action_type", "user_id", "item_id", "item_name", "timestamp", "details"],
+            select(
+                literal(log_entry["action_type"]),
+                literal(user_id),
+                Item.id,
+                Item.name,
+                undocked_at,
+                literal(log_entry["details"], JSON)
+            ).where(in_container)
+        ))
+        if engine.dialect.delete_returning:
+            removed = db.execute(delete(Item).where(in_container).returning(Item.id, Item.name)).mappings().all()
+        else:
+            removed = fetch_all(db, (Item.id, Item.name), in_container)
+            db.execute(delete(Item).where(in_container))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    
+    for name, count in Counter(item["name"] for item in removed).items():
+        name_index.remove(name, count)
+    waste_tracker.remove(item["id"] for item in removed)
+    return removed
+
+def waste_state(item: Mapping[str, Any]) -> Tuple[str, Optional[datetime]]:
+    """
+    The fields of an item the waste tracker follows.
+    """
+    return item["id"], item.get("expiry_date")
+
+# Inventory version
+def get_inventory_version(db: Session) -> int:
+    """
+    Get the current inventory version.
+    """
+    return db.execute(select(InventoryVersion.version).where(InventoryVersion.id == 1)).scalar() or 0
+
+def bump_inventory_version(db: Session) -> None:
+    """
+    Increment the inventory version as part of the caller's transaction.
+    """
+    db.execute(
+        update(InventoryVersion)
+        .where(InventoryVersion.id == 1)
+        .values(version=InventoryVersion.version + 1)
+    )
+
+def load_containers(db: Session) -> List[Dict[str, Any]]:
+    """
+    Load all containers straight from the database, bypassing the cache.
+    """
+    return [dict(container) for container in fetch_all(db, CONTAINER_COLUMNS)]
+
+container_cache = ContainerCache(
+    load_containers,
+    get_inventory_version,
+    check_interval_ms=CONTAINER_CACHE_CHECK_INTERVAL_MS
+)
+
 # Database operations for containers
 def get_container_by_id(db: Session, container_id: str) -> Optional[Dict[str, Any]]:
     """
     Get a container by its ID.
+    Served from the container cache; the returned dict must not be modified.
     """
-    container = db.query(Container).filter(Container.id == container_id).first()
-    if not container:
-        return None
+    return container_cache.get(db, container_id)
+
+def get_all_containers(db: Session) -> List[Dict[str, Any]]:
+    """
+    Get all containers.
+    Served from the container cache; the returned dicts must not be modified.
+    """
+    return container_cache.all(db)
+
+def get_container_stats(db: Session, container_id: str) -> Dict[str, Any]:
+    """
+    Get how full a container is: item count, used volume and weight,
+    earliest expiry, and the share of its volume in use.
+    """
+    if CONTAINER_STATS_ENABLED:
+        row = fetch_one(db, CONTAINER_STATS_COLUMNS, ContainerStats.container_id == container_id)
+        stats = dict(row) if row else {}
+    else:
+        row = db.execute(
+            select(
+                func.count().label("item_count"),
+                func.sum(Item.weight).label("used_weight"),
+                func.min(Item.expiry_date).label("earliest_expiry")
+            ).where(Item.container_id == container_id)
+        ).mappings().first()
+        positions = db.execute(select(Item.position).where(Item.container_id == container_id)).scalars()
+        stats = {**row, "used_volume": sum(position_volume(position) for position in positions)}
     
+    container = get_container_by_id(db, container_id)
+    volume = container_volume(container) if container else 0.0
+    used_volume = stats.get("used_volume") or 0.0
     return {
-        "id": container.id,
-        "name": container.name,
-        "zone": container.zone,
-        "dimensions": container.dimensions,
-        "max_weight": container.max_weight
+        "item_count": stats.get("item_count") or 0,
+        "used_volume": used_volume,
+        "used_weight": stats.get("used_weight") or 0.0,
+        "earliest_expiry": stats.get("earliest_expiry"),
+        "space_efficiency": used_volume / volume if volume else 0.0
     }
 
-def get_all_containers(db: Session) -> List[Dict[str, Any]]:
+def get_container_versions(db: Session, container_ids: List[str]) -> Dict[str, Optional[int]]:
     """
-    Get all containers from the database.
+    Get, per container, a counter that changes whenever its items change.
+    Versions are None when change tracking is unavailable.
     """
-    containers = db.query(Container).all()
-    
-    return [
-        {
-            "id": container.id,
-            "name": container.name,
-            "zone": container.zone,
-            "dimensions": container.dimensions,
-            "max_weight": container.max_weight
-        }
-        for container in containers
-    ]
+    if not CONTAINER_STATS_ENABLED:
+        return {container_id: None for container_id in container_ids}
+    versions = dict(db.execute(
+        select(ContainerStats.container_id, ContainerStats.version)
+        .where(ContainerStats.container_id.in_(set(container_ids)))
+    ).all())
+    return {container_id: versions.get(container_id) or 0 for container_id in container_ids}
+
+def position_volume(position: Optional[Dict[str, Any]]) -> float:
+    """
+    Volume of a stored {"start": ..., "end": ...} position.
+    """
+    if not position:
+        return 0.0
+    start, end = position["start"], position["end"]
+    return (
+        (end["width"] - start["width"]) *
+        (end["depth"] - start["depth"]) *
+        (end["height"] - start["height"])
+    )
+
+def container_volume(container: Mapping[str, Any]) -> float:
+    """
+    Total volume of a container, 0 when its dimensions are unknown.
+    """
+    dimensions = container.get("dimensions")
+    if not dimensions:
+        return 0.0
+    return dimensions["width"] * dimensions["depth"] * dimensions["height"]
 
 def create_container(db: Session, container_data: Dict[str, Any]) -> Dict[str, Any]:
     """
     Create a new container in the database.
     """
-    container = Container(**container_data)
-    db.add(container)
-    db.commit()
-    db.refresh(container)
+    return import_containers(db, [container_data])[0]
+
+def import_containers(db: Session, containers_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Insert several containers in one transaction and bump the inventory
+    version once so every worker reloads its container cache.
+    """
+    containers = [
+        {"name": None, "zone": None, "dimensions": None, "max_weight": 0.0, **container_data}
+        for container_data in containers_data
+    ]
+    if containers:
+        db.execute(insert(Container), containers)
+        bump_inventory_version(db)
+        db.commit()
+        container_cache.invalidate()
     
-    return {
-        "id": container.id,
-        "name": container.name,
-        "zone": container.zone,
-        "dimensions": container.dimensions,
-        "max_weight": container.max_weight
-    }
+    return containers
 
-def get_items_by_container(db: Session, container_id: str) -> List[Dict[str, Any]]:
+def get_items_by_container(db: Session, container_id: str) -> List[Mapping[str, Any]]:
     """
     Get all items in a specific container.
     """
-    items = db.query(Item).filter(Item.container_id == container_id).all()
+    return fetch_all(db, ITEM_COLUMNS, Item.container_id == container_id)
+
+def get_items_by_containers(db: Session, container_ids: List[str]) -> Dict[str, List[Mapping[str, Any]]]:
+    """
+    Get the items of several containers in one query, keyed by container.
+    """
+    items: Dict[str, List[Mapping[str, Any]]] = {container_id: [] for container_id in container_ids}
+    if container_ids:
+        for item in fetch_all(db, ITEM_COLUMNS, Item.container_id.in_(set(container_ids))):
+            items[item["container_id"]].append(item)
+    return items
+
+def get_items_in_region(
+    db: Session,
+    container_id: str,
+    start: Dict[str, float],
+    end: Dict[str, float]
+) -> List[Mapping[str, Any]]:
+    """
+    Get the items in a container whose boxes intersect the region between
+    `start` and `end` (dicts of width/depth/height). Boxes that merely touch
+    the region's faces do not count as intersecting.
+    """
+    if SPATIAL_INDEX_ENABLED:
+        columns = ", ".join(f"items.{column.key}" for column in ITEM_COLUMNS)
+        statement = text(
+            f"SELECT {columns} FROM items_rtree "
+            "JOIN items_rtree_containers AS keys ON keys.container_id = :container_id "
+            "JOIN items_rtree_keys AS item_keys ON item_keys.rtree_key = items_rtree.id "
+            "JOIN items ON items.id = item_keys.item_id "
+            "WHERE items_rtree.min_container <= keys.container_key "
+            "AND items_rtree.max_container >= keys.container_key "
+            "AND items_rtree.min_width < :end_width AND items_rtree.max_width > :start_width "
+            "AND items_rtree.min_depth < :end_depth AND items_rtree.max_depth > :start_depth "
+            "AND items_rtree.min_height < :end_height AND items_rtree.max_height > :start_height"
+        ).columns(*ITEM_COLUMNS)
+        candidates = db.execute(statement, {
+            "container_id": container_id,
+            "start_width": start["width"], "end_width": end["width"],
+            "start_depth": start["depth"], "end_depth": end["depth"],
+            "start_height": start["height"], "end_height": end["height"]
+        }).mappings().all()
+    else:
+        candidates = get_items_by_container(db, container_id)
     
+    # R*Tree stores 32-bit floats rounded outwards, so confirm exactly
     return [
-        {
-            "id": item.id,
-            "name": item.name,
-            "container_id": item.container_id,
-            "zone": item.zone,
-            "position": item.position,
-            "expiry_date": item.expiry_date,
-            "usage_count": item.usage_count,
-            "max_uses": item.max_uses,
-            "weight": item.weight
-        }
-        for item in items
+        item for item in candidates
+        if item["position"] and boxes_intersect(item["position"]["start"], item["position"]["end"], start, end)
     ]
 
+def boxes_intersect(
+    start1: Dict[str, float],
+    end1: Dict[str, float],
+    start2: Dict[str, float],
+    end2: Dict[str, float]
+) -> bool:
+    """
+    Check if two axis-aligned boxes overlap with non-zero volume.
+    """
+    return all(
+        start1[axis] < end2[axis] and start2[axis] < end1[axis]
+        for axis in ("width", "depth", "height")
+    )
+
 # Logging operations
 def log_action(
     db: Session, 
@@ -271,65 +926,193 @@ def log_action(
 ) -> None:
     """
     Log an action in the database.
+    Rows are handed to the buffered action log writer and group-committed
+    in the background; in synchronous mode they are committed on `db` directly.
     """
-    log_entry = ActionLog(
-        action_type=action_type,
-        user_id=user_id,
-        item_id=item_id,
-        item_name=item_name,
-        details=details
-    )
+    log_entry = build_log_entry(action_type, user_id, item_id, item_name, timestamp, details)
+    
+    if action_log_writer.synchronous:
+        db.add(ActionLog(**log_entry))
+        db.commit()
+        return
+    
+    action_log_writer.write(log_entry)
+
+def log_actions(db: Session, actions: List[Dict[str, Any]]) -> None:
+    """
+    Log several actions at once; each dict takes log_action's arguments.
+    In synchronous mode all rows are committed in one transaction.
+    """
+    log_entries = [build_log_entry(**action) for action in actions]
+    if not log_entries:
+        return
+    
+    if action_log_writer.synchronous:
+        db.execute(insert(ActionLog), log_entries)
+        db.commit()
+        return
+    
+    action_log_writer.write_many(log_entries)
+
+def build_log_entry(
+    action_type: str,
+    user_id: str,
+    item_id: str,
+    item_name: Optional[str] = None,
+    timestamp: Optional[str] = None,
+    details: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Build an action log row, using the current time when `timestamp` is missing or invalid.
+    """
+    log_entry = {
+        "action_type": action_type,
+        "user_id": user_id,
+        "item_id": item_id,
+        "item_name": item_name,
+        "timestamp": datetime.utcnow(),
+        "details": details
+    }
     
     if timestamp:
         try:
-            log_entry.timestamp = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+            log_entry["timestamp"] = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
         except ValueError:
             # If timestamp is invalid, use current time
             pass
     
-    db.add(log_entry)
-    db.commit()
+    return log_entry
 
-def get_logs(
-    db: Session,
+def flush_action_logs() -> None:
+    """
+    Flush buffered action logs, e.g. on shutdown or before reading logs back.
+    """
+    action_log_writer.flush()
+
+LOG_COLUMNS = (
+    ActionLog.id,
+    ActionLog.timestamp,
+    ActionLog.action_type,
+    ActionLog.user_id,
+    ActionLog.item_id,
+    ActionLog.item_name,
+    ActionLog.details
+)
+
+def encode_log_cursor(log: Dict[str, Any]) -> str:
+    """
+    Build an opaque keyset cursor pointing just past the given log entry.
+    """
+    raw = f"{log['timestamp']}|{log['id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_log_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Decode a cursor produced by encode_log_cursor into (timestamp, id).
+    Raises ValueError for malformed cursors.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        timestamp, log_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(timestamp), int(log_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid log cursor: {cursor}") from e
+
+def build_logs_query(
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
     item_id: Optional[str] = None,
     user_id: Optional[str] = None,
-    action_type: Optional[str] = None
-) -> List[Dict[str, Any]]:
+    action_type: Optional[str] = None,
+    after: Optional[str] = None
+):
     """
-    Get logs filtered by various criteria.
+    Build the newest-first log query shared by get_logs and iter_logs.
     """
-    query = db.query(ActionLog)
+    query = select(*LOG_COLUMNS)
     
     if start_date:
-        query = query.filter(ActionLog.timestamp >= start_date)
+        query = query.where(ActionLog.timestamp >= start_date)
     
     if end_date:
-        query = query.filter(ActionLog.timestamp <= end_date)
+        query = query.where(ActionLog.timestamp <= end_date)
     
     if item_id:
-        query = query.filter(ActionLog.item_id == item_id)
+        query = query.where(ActionLog.item_id == item_id)
     
     if user_id:
-        query = query.filter(ActionLog.user_id == user_id)
+        query = query.where(ActionLog.user_id == user_id)
     
     if action_type:
-        query = query.filter(ActionLog.action_type == action_type)
+        query = query.where(ActionLog.action_type == action_type)
     
-    logs = query.order_by(ActionLog.timestamp.desc()).all()
+    if after:
+        cursor_timestamp, cursor_id = decode_log_cursor(after)
+        query = query.where(
+            or_(
+                ActionLog.timestamp < cursor_timestamp,
+                and_(ActionLog.timestamp == cursor_timestamp, ActionLog.id < cursor_id)
+            )
+        )
     
-    return [
-        {
-            "id": log.id,
-            "timestamp": log.timestamp.isoformat(),
-            "action_type": log.action_type,
-            "user_id": log.user_id,
-            "item_id": log.item_id,
-            "item_name": log.item_name,
-            "details": log.details
-        }
-        for log in logs
-    ]
+    return query.order_by(ActionLog.timestamp.desc(), ActionLog.id.desc())
+
+def get_logs(
+    db: Session,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    item_id: Optional[str] = None,
+    user_id: Optional[str] = None,
+    action_type: Optional[str] = None,
+    after: Optional[str] = None,
+    limit: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Get logs filtered by various criteria, newest first.
+    Pass `limit` to page through the results and `after` (a cursor from
+    encode_log_cursor) to continue from the last entry of the previous page.
+    """
+    # Make sure rows still sitting in the group-commit buffer are visible
+    flush_action_logs()
+    
+    query = build_logs_query(start_date, end_date, item_id, user_id, action_type, after)
+    
+    if limit:
+        query = query.limit(limit)
+    
+    return [log_row_to_dict(log) for log in db.execute(query).mappings()]
+
+def iter_logs(
+    db: Session,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    item_id: Optional[str] = None,
+    user_id: Optional[str] = None,
+    action_type: Optional[str] = None,
+    batch_size: int = STREAM_BATCH_SIZE
+) -> Iterator[Dict[str, Any]]:
+    """
+    Stream logs filtered by various criteria, newest first, using a
+    server-side cursor so memory stays flat regardless of the row count.
+    """
+    flush_action_logs()
+    
+    query = build_logs_query(start_date, end_date, item_id, user_id, action_type)
+    query = query.execution_options(yield_per=batch_size)
+    
+    for log in db.execute(query).mappings():
+        yield log_row_to_dict(log)
 
+def log_row_to_dict(log: Mapping[str, Any]) -> Dict[str, Any]:
+    """
+    Convert a projected action log row into its API dict form.
+    """
+    return {
+        "id": log["id"],
+        "timestamp": log["timestamp"].isoformat(),
+        "action_type": log["action_type"],
+        "user_id": log["user_id"],
+        "item_id": log["item_id"],
+        "item_name": log["item_name"],
+        "details": log["details"]
+    }
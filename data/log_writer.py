@@ -0,0 +1,168 @@
+import atexit
+import heapq
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import insert
+
+logger = logging.getLogger(__name__)
+
+class ActionLogWriter:
+    """
+    Group-commit writer for action log rows.
+    Rows are pushed onto a bounded in-memory queue and a background thread
+    inserts them in one transaction every `batch_size` rows or every
+    `flush_interval_ms` milliseconds, whichever comes first.
+    Queued rows are numbered in order; `flush` waits only for the rows
+    numbered up to the moment it was called, never for later ones.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable,
+        model: Any,
+        batch_size: int = 500,
+        flush_interval_ms: int = 50,
+        max_queue_size: int = 10000,
+        synchronous: bool = False
+    ):
+        self.session_factory = session_factory
+        self.model = model
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.synchronous = synchronous
+        self._queue: "queue.Queue[Tuple[int, Dict[str, Any]]]" = queue.Queue(maxsize=max_queue_size)
+        self._lock = threading.Lock()
+        # Number of the last queued row, and every row up to `_written` is written
+        self._queued = 0
+        self._written = 0
+        # Numbers of rows written ahead of an earlier one still in flight
+        self._written_ahead: List[int] = []
+        self._progress = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        atexit.register(self.close)
+
+    def write(self, row: Dict[str, Any]) -> None:
+        """
+        Queue a log row for the next group commit.
+        If the queue is full the row is written inline so that no entry is lost.
+        """
+        if self.synchronous:
+            self._insert([row], dequeued=False)
+            return
+
+        self._ensure_started()
+        try:
+            with self._progress:
+                self._queue.put_nowait((self._queued + 1, row))
+                self._queued += 1
+        except queue.Full:
+            self._insert([row], dequeued=False)
+
+    def write_many(self, rows: List[Dict[str, Any]]) -> None:
+        """
+        Queue several log rows at once.
+        """
+        for row in rows:
+            self.write(row)
+
+    def flush(self) -> None:
+        """
+        Write out everything queued before this call, including any batch the
+        background thread is committing right now. Rows queued meanwhile are
+        left to the background thread.
+        """
+        with self._progress:
+            watermark = self._queued
+        # Everything up to the watermark goes in one transaction
+        batch = self._drain(watermark)
+        if batch:
+            self._insert(batch)
+        with self._progress:
+            self._progress.wait_for(lambda: self._written >= watermark)
+
+    def close(self) -> None:
+        """
+        Stop the background thread and flush any pending rows.
+        """
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+        self._stopping.clear()
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run,
+                    name="action-log-writer",
+                    daemon=True
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+
+            batch = [first]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            self._insert(batch)
+
+    def _drain(self, watermark: int) -> List[Tuple[int, Dict[str, Any]]]:
+        # Queued rows are numbered in order, so stop at the first one past the watermark
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+            if batch[-1][0] >= watermark:
+                break
+        return batch
+
+    def _insert(self, rows: List, dequeued: bool = True) -> None:
+        """
+        Insert `rows` in one transaction; dequeued rows are (number, row)
+        pairs and count as written afterwards, even if the insert failed.
+        """
+        db = self.session_factory()
+        try:
+            db.execute(insert(self.model), [row for _, row in rows] if dequeued else rows)
+            db.commit()
+        except Exception:
+            db.rollback()
+            logger.exception("Failed to write %d action log rows", len(rows))
+        finally:
+            db.close()
+            if dequeued:
+                self._mark_written([number for number, _ in rows])
+
+    def _mark_written(self, numbers: List[int]) -> None:
+        with self._progress:
+            ahead = self._written_ahead
+            for number in numbers:
+                heapq.heappush(ahead, number)
+            while ahead and ahead[0] == self._written + 1:
+                heapq.heappop(ahead)
+                self._written += 1
+            self._progress.notify_all()
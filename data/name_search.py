@@ -0,0 +1,106 @@
+import re
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+# SQLite FTS5 shadow index over items.name.
+# items has a text primary key, so its implicit rowid is not stable (VACUUM
+# may renumber it); each item instead gets an INTEGER PRIMARY KEY in
+# items_fts_keys and the index stores its name under that key. Triggers
+# keep both in sync, so every write path (create_item, removal, imports,
+# raw SQL) updates it without extra application code.
+NAME_SEARCH_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS items_fts_keys (
+        fts_key INTEGER PRIMARY KEY,
+        item_id VARCHAR UNIQUE NOT NULL
+    )
+    """,
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5(
+        name,
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """
+]
+
+NAME_SEARCH_TRIGGERS = [
+    """
+    CREATE TRIGGER items_fts_insert AFTER INSERT ON items BEGIN
+        INSERT OR IGNORE INTO items_fts_keys(item_id) VALUES (new.id);
+        INSERT INTO items_fts(rowid, name)
+            SELECT fts_key, new.name FROM items_fts_keys WHERE item_id = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER items_fts_delete AFTER DELETE ON items BEGIN
+        DELETE FROM items_fts WHERE rowid = (SELECT fts_key FROM items_fts_keys WHERE item_id = old.id);
+        DELETE FROM items_fts_keys WHERE item_id = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER items_fts_update AFTER UPDATE OF id, name ON items BEGIN
+        UPDATE items_fts_keys SET item_id = new.id WHERE item_id = old.id;
+        UPDATE items_fts SET name = new.name
+            WHERE rowid = (SELECT fts_key FROM items_fts_keys WHERE item_id = new.id);
+    END
+    """
+]
+
+NAME_SEARCH_BACKFILL = [
+    "INSERT OR IGNORE INTO items_fts_keys(item_id) SELECT id FROM items",
+    """
+    INSERT INTO items_fts(rowid, name)
+    SELECT keys.fts_key, items.name FROM items JOIN items_fts_keys AS keys ON keys.item_id = items.id
+    """
+]
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+def setup_name_search(engine: Engine) -> bool:
+    """
+    Create the FTS5 name index and its sync triggers if they are missing.
+    Returns False when the database is not SQLite or lacks FTS5 support.
+    """
+    if engine.dialect.name != "sqlite":
+        return False
+    
+    with engine.begin() as connection:
+        tables = set(connection.execute(
+            text("SELECT name FROM sqlite_master WHERE name IN ('items_fts', 'items_fts_keys')")
+        ).scalars())
+        
+        try:
+            if "items_fts" in tables and "items_fts_keys" not in tables:
+                # Built by an older version keyed on items.rowid; rebuild it
+                connection.execute(text("DROP TABLE items_fts"))
+                tables.discard("items_fts")
+            for statement in NAME_SEARCH_TABLES:
+                connection.execute(text(statement))
+            # Triggers are always recreated, so existing databases get the current ones
+            for name in ("items_fts_insert", "items_fts_delete", "items_fts_update"):
+                connection.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+            for statement in NAME_SEARCH_TRIGGERS:
+                connection.execute(text(statement))
+        except Exception:
+            # SQLite build without FTS5
+            return False
+        
+        if "items_fts" not in tables:
+            # Backfill names that were inserted before the index existed
+            for statement in NAME_SEARCH_BACKFILL:
+                connection.execute(text(statement))
+    
+    return True
+
+def build_match_query(name: str) -> Optional[str]:
+    """
+    Turn free text into an FTS5 query matching every token as a prefix,
+    e.g. "oxygen ta" -> '"oxygen"* AND "ta"*'.
+    Returns None if the text contains no searchable tokens.
+    """
+    tokens = TOKEN_PATTERN.findall(name)
+    if not tokens:
+        return None
+    return " AND ".join(f'"{token}"*' for token in tokens)
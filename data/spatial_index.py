@@ -0,0 +1,142 @@
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+# SQLite R*Tree mirror of item positions.
+# Each item's box is stored under a stable integer key from items_rtree_keys
+# (items has a text primary key, and its implicit rowid may change on
+# VACUUM) with the container as a fourth dimension, so a region query only
+# touches nodes of that container. Containers are numbered through
+# items_rtree_containers because R*Tree coordinates must be numeric.
+# Triggers keep the tree in sync with every write to items (create_item,
+# update_item_position, removals, imports). Positions missing a coordinate
+# are left out, and each axis is stored as min/max of its two ends, so the
+# mirror never rejects a write the items table accepts.
+AXES = ("width", "depth", "height")
+
+def has_box(row: str) -> str:
+    return " AND ".join(
+        f"json_extract({row}.position, '$.{end}.{axis}') IS NOT NULL"
+        for end in ("start", "end") for axis in AXES
+    )
+
+def box_columns(row: str) -> str:
+    return ", ".join(
+        f"{bound}(json_extract({row}.position, '$.start.{axis}'), json_extract({row}.position, '$.end.{axis}'))"
+        for axis in AXES for bound in ("min", "max")
+    )
+
+SPATIAL_INDEX_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS items_rtree_containers (
+        container_key INTEGER PRIMARY KEY,
+        container_id VARCHAR UNIQUE NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS items_rtree_keys (
+        rtree_key INTEGER PRIMARY KEY,
+        item_id VARCHAR UNIQUE NOT NULL
+    )
+    """,
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS items_rtree USING rtree(
+        id,
+        min_container, max_container,
+        min_width, max_width,
+        min_depth, max_depth,
+        min_height, max_height
+    )
+    """
+]
+
+INDEX_NEW_ITEM = """
+        INSERT OR IGNORE INTO items_rtree_containers(container_id)
+            SELECT new.container_id WHERE new.container_id IS NOT NULL AND {has_box};
+        INSERT OR IGNORE INTO items_rtree_keys(item_id)
+            SELECT new.id WHERE new.container_id IS NOT NULL AND {has_box};
+        INSERT INTO items_rtree SELECT item_keys.rtree_key, keys.container_key, keys.container_key, {box}
+        FROM items_rtree_keys AS item_keys JOIN items_rtree_containers AS keys
+        WHERE item_keys.item_id = new.id AND keys.container_id = new.container_id AND {has_box};
+""".format(has_box=has_box("new"), box=box_columns("new"))
+
+UNINDEX_OLD_ITEM = """
+        DELETE FROM items_rtree WHERE id = (SELECT rtree_key FROM items_rtree_keys WHERE item_id = old.id);
+"""
+
+SPATIAL_INDEX_TRIGGERS = [
+    """
+    CREATE TRIGGER items_rtree_insert AFTER INSERT ON items BEGIN
+    """ + INDEX_NEW_ITEM + """
+    END
+    """,
+    """
+    CREATE TRIGGER items_rtree_update AFTER UPDATE OF id, position, container_id ON items BEGIN
+    """ + UNINDEX_OLD_ITEM + """
+        DELETE FROM items_rtree_keys WHERE item_id = old.id AND old.id IS NOT new.id;
+    """ + INDEX_NEW_ITEM + """
+    END
+    """,
+    """
+    CREATE TRIGGER items_rtree_delete AFTER DELETE ON items BEGIN
+    """ + UNINDEX_OLD_ITEM + """
+        DELETE FROM items_rtree_keys WHERE item_id = old.id;
+    END
+    """
+]
+
+SPATIAL_INDEX_BACKFILL = [
+    """
+    INSERT OR IGNORE INTO items_rtree_containers(container_id)
+    SELECT DISTINCT container_id FROM items AS new
+    WHERE container_id IS NOT NULL AND {has_box}
+    """.format(has_box=has_box("new")),
+    """
+    INSERT OR IGNORE INTO items_rtree_keys(item_id)
+    SELECT id FROM items AS new
+    WHERE container_id IS NOT NULL AND {has_box}
+    """.format(has_box=has_box("new")),
+    """
+    INSERT INTO items_rtree
+    SELECT item_keys.rtree_key, keys.container_key, keys.container_key, {box}
+    FROM items AS new
+    JOIN items_rtree_keys AS item_keys ON item_keys.item_id = new.id
+    JOIN items_rtree_containers AS keys ON keys.container_id = new.container_id
+    WHERE {has_box}
+    """.format(has_box=has_box("new"), box=box_columns("new"))
+]
+
+def setup_spatial_index(engine: Engine) -> bool:
+    """
+    Create the R*Tree position index and its sync triggers if they are missing.
+    Returns False when the database is not SQLite or lacks R*Tree support.
+    """
+    if engine.dialect.name != "sqlite":
+        return False
+    
+    with engine.begin() as connection:
+        tables = set(connection.execute(
+            text("SELECT name FROM sqlite_master WHERE name IN ('items_rtree', 'items_rtree_keys')")
+        ).scalars())
+        
+        try:
+            if "items_rtree" in tables and "items_rtree_keys" not in tables:
+                # Built by an older version keyed on items.rowid; rebuild it
+                connection.execute(text("DROP TABLE items_rtree"))
+                tables.discard("items_rtree")
+            for statement in SPATIAL_INDEX_TABLES:
+                connection.execute(text(statement))
+            # Triggers are always recreated, so existing databases get the current ones
+            for name in ("items_rtree_insert", "items_rtree_update", "items_rtree_delete"):
+                connection.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+            for statement in SPATIAL_INDEX_TRIGGERS:
+                connection.execute(text(statement))
+        except Exception:
+            # SQLite build without R*Tree or JSON1
+            return False
+        
+        if "items_rtree" not in tables:
+            # Index positions stored before the tree existed
+            for statement in SPATIAL_INDEX_BACKFILL:
+                connection.execute(text(statement))
+    
+    return True
@@ -0,0 +1,159 @@
+import logging
+import sys
+import threading
+from array import array
+from math import ceil
+from typing import Callable, Dict, Iterable, List, Set, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+def trigrams(text: str) -> Set[str]:
+    """
+    Trigrams of each word, padded like pg_trgm ("tank" -> "  t", " ta", "tan", "ank", "nk ").
+    """
+    grams = set()
+    for word in text.casefold().split():
+        padded = f"  {word} "
+        for index in range(len(padded) - 2):
+            grams.add(padded[index:index + 3])
+    return grams
+
+class TrigramIndex:
+    """
+    In-memory trigram index over distinct item names for typo-tolerant lookup.
+    Each trigram maps to a posting list of name numbers. A query counts how
+    many of its trigrams each name shares with vectorized passes over its
+    posting lists, then ranks the names sharing enough of them by Jaccard
+    similarity of the trigram sets.
+    """
+
+    def __init__(self, min_similarity: float = 0.3):
+        self.min_similarity = min_similarity
+        self.names: List[str] = []
+        self.numbers: Dict[str, int] = {}
+        # Items currently carrying each name; a name at 0 is skipped by queries
+        self.counts = array("I")
+        # Number of distinct trigrams in each name
+        self.sizes = array("H")
+        self.postings: Dict[str, array] = {}
+        self.ready = threading.Event()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.numbers)
+
+    def build_in_background(self, load_names: Callable[[], Iterable[Iterable[Tuple[str, int]]]]) -> threading.Thread:
+        """
+        Fill the index from batches of (name, item count) pairs on a
+        background thread; `ready` is set once every batch is in.
+        Names added or removed meanwhile are applied as they happen.
+        """
+        def build():
+            try:
+                for batch in load_names():
+                    self.add_many(batch)
+                logger.info("Name index ready: %s", self.stats())
+            except Exception:
+                logger.exception("Failed to build the name index")
+            finally:
+                self.ready.set()
+
+        thread = threading.Thread(target=build, name="name-index-build", daemon=True)
+        thread.start()
+        return thread
+
+    def add(self, name: str, count: int = 1) -> None:
+        """
+        Record `count` more items named `name`.
+        """
+        self.add_many([(name, count)])
+
+    def add_many(self, names: Iterable[Tuple[str, int]]) -> None:
+        """
+        Record several (name, item count) pairs.
+        """
+        with self._lock:
+            numbers, postings, counts = self.numbers, self.postings, self.counts
+            for name, count in names:
+                if not name:
+                    continue
+                number = numbers.get(name)
+                if number is None:
+                    number = numbers[name] = len(self.names)
+                    self.names.append(name)
+                    counts.append(0)
+                    grams = trigrams(name)
+                    self.sizes.append(min(len(grams), 0xFFFF))
+                    for gram in grams:
+                        posting = postings.get(gram)
+                        if posting is None:
+                            posting = postings[gram] = array("I")
+                        posting.append(number)
+                counts[number] += count
+
+    def remove(self, name: str, count: int = 1) -> None:
+        """
+        Record that `count` items named `name` are gone.
+        """
+        with self._lock:
+            number = self.numbers.get(name)
+            if number is not None:
+                self.counts[number] = max(0, self.counts[number] - count)
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[str, float]]:
+        """
+        Get up to `limit` names most similar to `query` as (name, similarity),
+        best first, leaving out names below `min_similarity`.
+        """
+        query_grams = trigrams(query)
+        if not query_grams:
+            return []
+
+        with self._lock:
+            postings = [self.postings[gram] for gram in query_grams if gram in self.postings]
+            if not postings:
+                return []
+            # A name reaching the threshold shares at least `required` trigrams:
+            # |A ∩ B| / |A ∪ B| >= s needs |A ∩ B| >= s * |A|
+            required = max(1, ceil(self.min_similarity * len(query_grams)))
+            # Counts reach len(postings), so the counter must hold that many
+            shared = np.zeros(len(self.names), dtype=np.uint16 if len(postings) <= 0xFFFF else np.uint32)
+            for posting in postings:
+                # Each posting list holds a name at most once
+                shared[np.frombuffer(posting, dtype=np.uint32)] += 1
+            candidates = np.flatnonzero(shared >= required)
+            counts = np.frombuffer(self.counts, dtype=np.uint32)[candidates]
+            candidates = candidates[counts > 0]
+
+            overlap = shared[candidates].astype(np.int64)
+            sizes = np.frombuffer(self.sizes, dtype=np.uint16)[candidates]
+            similarity = overlap / (len(query_grams) + sizes - overlap)
+            keep = similarity >= self.min_similarity
+            candidates, similarity = candidates[keep], similarity[keep]
+            if len(candidates) > limit:
+                top = np.argpartition(-similarity, limit - 1)[:limit]
+                candidates, similarity = candidates[top], similarity[top]
+            results = [(self.names[number], float(score)) for number, score in zip(candidates, similarity)]
+
+        results.sort(key=lambda entry: (-entry[1], entry[0]))
+        return results
+
+    def memory_bytes(self) -> int:
+        """
+        Approximate memory held by the index.
+        """
+        with self._lock:
+            size = sum(sys.getsizeof(value) for value in (self.names, self.numbers, self.counts, self.sizes, self.postings))
+            size += sum(sys.getsizeof(name) for name in self.names)
+            size += sum(sys.getsizeof(gram) + sys.getsizeof(posting) for gram, posting in self.postings.items())
+        return size
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "ready": self.ready.is_set(),
+            "names": len(self.numbers),
+            "trigrams": len(self.postings),
+            "memoryBytes": self.memory_bytes()
+        }
@@ -0,0 +1,158 @@
+import heapq
+import logging
+import threading
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (item_id, expiry_date)
+ItemState = Tuple[str, Optional[datetime]]
+
+# Stale heap entries tolerated before the heap is rebuilt from live items
+COMPACT_MIN_STALE = 1024
+
+class WasteTracker:
+    """
+    Resident index of the items about to become waste by expiring.
+    Expiry dates after the tracker's horizon sit in a min-heap; a lookup
+    moves the horizon up to its start and forgets everything expiring
+    before it. It is kept current by this worker's item writes in
+    data/database.py only, so it is a shortcut: callers validate its
+    answer against the database, which stays the source of truth.
+    Heap entries of removed items are left behind and skipped (their
+    expiry no longer matches), and dropped when the heap is rebuilt.
+    """
+
+    def __init__(self):
+        self.expiries: Dict[str, datetime] = {}
+        # Nothing expiring at or before the horizon is tracked
+        self.horizon = datetime.min
+        self._heap: List[Tuple[datetime, str]] = []
+        self._stale = 0
+        # Items written while the initial load runs; their loaded rows are older
+        self._changed: Optional[Set[str]] = None
+        self.ready = threading.Event()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.expiries)
+
+    def build_in_background(self, load_items: Callable[[], Iterable[Iterable[ItemState]]]) -> threading.Thread:
+        """
+        Fill the tracker from batches of item states on a background thread;
+        `ready` is set once every batch is in. Writes made meanwhile are
+        applied as they happen and win over the loaded rows.
+        """
+        with self._lock:
+            self._changed = set()
+
+        def build():
+            try:
+                for batch in load_items():
+                    with self._lock:
+                        for state in batch:
+                            if state[0] not in self._changed:
+                                self._set(*state)
+                logger.info("Waste tracker ready: %s", self.stats())
+            except Exception:
+                logger.exception("Failed to build the waste tracker")
+            finally:
+                with self._lock:
+                    self._changed = None
+                self.ready.set()
+
+        thread = threading.Thread(target=build, name="waste-tracker-build", daemon=True)
+        thread.start()
+        return thread
+
+    def add_many(self, items: Iterable[ItemState]) -> None:
+        """
+        Record new or replaced items.
+        """
+        with self._lock:
+            for state in items:
+                self._touch(state[0])
+                self._set(*state)
+
+    def remove(self, item_ids: Iterable[str]) -> None:
+        """
+        Forget items that left the inventory.
+        """
+        with self._lock:
+            for item_id in item_ids:
+                self._touch(item_id)
+                self._forget_expiry(item_id)
+            self._compact_if_needed()
+
+    def expiring_between(self, start: datetime, end: datetime) -> List[Tuple[datetime, str]]:
+        """
+        (expiry_date, item_id) of items expiring after `start` and no later
+        than `end`, earliest first, as far as this worker knows. Moves the
+        horizon forward to `start`; earlier starts get only what is left.
+        """
+        with self._lock:
+            self._advance(start)
+            found = self._upcoming(start, end)
+        return sorted((expiry, item_id) for item_id, expiry in found.items())
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "ready": self.ready.is_set(),
+                "items": len(self.expiries),
+                "heapEntries": len(self._heap)
+            }
+
+    def _advance(self, at: datetime) -> None:
+        if at <= self.horizon:
+            return
+        heap, expiries = self._heap, self.expiries
+        while heap and heap[0][0] <= at:
+            expiry, item_id = heapq.heappop(heap)
+            if expiries.get(item_id) == expiry:
+                del expiries[item_id]
+            else:
+                self._stale = max(0, self._stale - 1)
+        self.horizon = at
+
+    def _upcoming(self, start: datetime, end: datetime) -> Dict[str, datetime]:
+        # Walk the heap as a tree: below an entry past `end` every entry is
+        # past `end` too, so only the k matches and their children are read
+        found = {}
+        heap, expiries = self._heap, self.expiries
+        pending = [0] if heap else []
+        while pending:
+            index = pending.pop()
+            expiry, item_id = heap[index]
+            if expiry > end:
+                continue
+            if expiry > start and expiries.get(item_id) == expiry:
+                found[item_id] = expiry
+            for child in (2 * index + 1, 2 * index + 2):
+                if child < len(heap):
+                    pending.append(child)
+        return found
+
+    def _forget_expiry(self, item_id: str) -> None:
+        if self.expiries.pop(item_id, None) is not None:
+            # Its heap entry is still there
+            self._stale += 1
+
+    def _touch(self, item_id: str) -> None:
+        if self._changed is not None:
+            self._changed.add(item_id)
+
+    def _set(self, item_id: str, expiry_date: Optional[datetime]) -> None:
+        if self.expiries.get(item_id) != expiry_date:
+            self._forget_expiry(item_id)
+            if expiry_date is not None and expiry_date > self.horizon:
+                self.expiries[item_id] = expiry_date
+                heapq.heappush(self._heap, (expiry_date, item_id))
+        self._compact_if_needed()
+
+    def _compact_if_needed(self) -> None:
+        if self._stale > COMPACT_MIN_STALE and self._stale > len(self._heap) // 2:
+            self._heap = [(expiry, item_id) for item_id, expiry in self.expiries.items()]
+            heapq.heapify(self._heap)
+            self._stale = 0
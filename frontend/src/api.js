@@ -177,6 +177,18 @@ const api = {
         if (actionType) params.append('actionType', actionType);
         
         return this.fetch(`/logs?${params.toString()}`, { method: 'GET' });
+    },
+    
+    async exportLogs(format, startDate, endDate, itemId, userId, actionType) {
+        const params = new URLSearchParams();
+        if (format) params.append('format', format);
+        if (startDate) params.append('startDate', startDate);
+        if (endDate) params.append('endDate', endDate);
+        if (itemId) params.append('itemId', itemId);
+        if (userId) params.append('userId', userId);
+        if (actionType) params.append('actionType', actionType);
+        
+        return this.downloadFile(`/logs/export?${params.toString()}`, { method: 'GET' });
     }
 };
 
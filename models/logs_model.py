@@ -0,0 +1,19 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional, Dict, Any
+
+# Log entry model
+class LogEntry(BaseModel):
+    id: int
+    timestamp: str
+    userId: Optional[str] = None
+    actionType: Optional[str] = None
+    itemId: Optional[str] = None
+    itemName: Optional[str] = None
+    details: Optional[Dict[str, Any]] = None
+
+# Logs response model
+class LogsResponse(BaseModel):
+    success: bool
+    message: Optional[str] = None
+    logs: List[LogEntry] = []
+    nextCursor: Optional[str] = Field(None, description="Pass as 'after' to fetch the next page")
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional
 
 class Coordinates(BaseModel):
@@ -30,3 +30,53 @@ class PlaceRequest(BaseModel):
     containerId: str
     position: Position
 
+
+class PlacementStep(BaseModel):
+    step: int
+    description: str
+
+class PlacementRecommendation(BaseModel):
+    itemId: str
+    itemName: str
+    containerId: str
+    zone: Optional[str] = None
+    position: Position
+    reason: str
+    steps: List[PlacementStep] = []
+
+class PlacementResponse(BaseModel):
+    success: bool
+    message: Optional[str] = None
+    recommendation: Optional[PlacementRecommendation] = None
+
+class BatchPlacementItem(BaseModel):
+    itemId: str
+    name: Optional[str] = None
+    width: float
+    depth: float
+    height: float
+    weight: float = 0.0
+    priority: int = Field(0, description="Higher priority items are packed first")
+    preferredZone: Optional[str] = None
+    expiryDate: Optional[str] = Field(None, description="ISO format date, for items new to the inventory")
+    usageLimit: Optional[int] = None
+
+class BatchPlacementRequest(BaseModel):
+    items: List[BatchPlacementItem]
+    userId: Optional[str] = None
+    timestamp: Optional[str] = Field(None, description="ISO format timestamp")
+
+class BatchPlacementResult(BaseModel):
+    itemId: str
+    containerId: str
+    position: Position
+
+class UnplacedItem(BaseModel):
+    itemId: str
+    reason: str
+
+class BatchPlacementResponse(BaseModel):
+    success: bool
+    message: Optional[str] = None
+    placements: List[BatchPlacementResult] = []
+    unplaced: List[UnplacedItem] = []
@@ -60,6 +60,58 @@ class PlaceResponse(BaseModel):
     success: bool
     message: Optional[str] = None
 
+# Region search request model
+class RegionSearchRequest(BaseModel):
+    containerId: str
+    startCoordinates: Coordinates
+    endCoordinates: Coordinates
+
+# Region search response model
+class RegionSearchResponse(BaseModel):
+    success: bool
+    message: Optional[str] = None
+    items: List[ItemDetail] = []
+
+# Typo-tolerant name index size
+class NameIndexStatsResponse(BaseModel):
+    success: bool
+    ready: bool = Field(..., description="False while the index is still being built")
+    names: int
+    trigrams: int
+    memoryBytes: int
+
+# Batch search request model
+# Most IDs, and most names, one batch search may ask for
+BATCH_SEARCH_MAX_ITEMS = 1000
+
+class BatchSearchRequest(BaseModel):
+    itemIds: List[str] = Field([], max_length=BATCH_SEARCH_MAX_ITEMS)
+    itemNames: List[str] = Field([], max_length=BATCH_SEARCH_MAX_ITEMS)
+    userId: Optional[str] = None
+
+class BatchSearchResult(BaseModel):
+    itemId: Optional[str] = None
+    itemName: Optional[str] = None
+    result: SearchResponse
+
+# Batch search response model
+class BatchSearchResponse(BaseModel):
+    success: bool
+    message: Optional[str] = None
+    results: List[BatchSearchResult] = []
+
+# Search cache counters
+class SearchCacheStatsResponse(BaseModel):
+    success: bool
+    size: int
+    maxEntries: int
+    hits: int
+    misses: int
+    coalesced: int = Field(..., description="Searches that waited for an identical search in progress")
+    hitRate: float
+    evictions: int
+    invalidations: int
+
 # Example data for documentation
 class Config:
     schema_extra = {
@@ -18,9 +18,17 @@ class SimulationChanges(BaseModel):
     itemsExpired: List[ItemUsage] = []
     itemsDepletedToday: List[ItemUsage] = []
 
+# Totals for one simulated day
+class SimulationDay(BaseModel):
+    day: int
+    date: str
+    itemsUsed: int = Field(0, description="Uses made that day")
+    itemsExpired: List[str] = []
+    itemsDepleted: List[str] = []
+
 # Simulation request model
 class SimulationRequest(BaseModel):
-    numOfDays: Optional[int] = Field(None, description="Number of days to simulate")
+    numOfDays: Optional[int] = Field(None, ge=0, description="Number of days to simulate")
     toTimestamp: Optional[str] = Field(None, description="ISO format timestamp to simulate to")
     itemsToBeUsedPerDay: List[Union[Dict[str, Any], ItemInput]] = Field(
         ..., 
@@ -49,6 +57,7 @@ class SimulationResponse(BaseModel):
     success: bool
     newDate: str
     changes: SimulationChanges
+    dailyChanges: List[SimulationDay] = []
     message: Optional[str] = None
     
     class Config:
@@ -61,6 +61,7 @@ class ReturnManifest(BaseModel):
     returnItems: List[ReturnItemInfo]
     totalVolume: float
     totalWeight: float
+    optimalityGap: Optional[float] = Field(None, description="How far the selection may be from the best possible one, 0 when proven optimal")
 
 # Return plan response
 class ReturnPlanResponse(BaseModel):
@@ -0,0 +1,54 @@
+from bisect import bisect_left, insort
+from operator import itemgetter
+from typing import Dict, Iterator, List, Optional, Tuple
+
+Point = Tuple[float, float, float]
+
+class ExtremePoints:
+    """
+    Candidate corners of one container, kept sorted front-most, then lowest,
+    then left-most (depth, height, width) so placement walks them in order
+    without re-sorting.
+    Each point can carry its residual free extent: how far the free space
+    reaches from it along each axis (also sorted, to rule out every
+    orientation of an item at once), as of a container generation. Adding
+    items only shrinks free space, so a stale extent still bounds what fits
+    there; anything freeing space must call `forget_extents`.
+    """
+
+    def __init__(self, points: Optional[List[Point]] = None):
+        # (depth, height, width, point), so sorting orders by depth first
+        self._keys: List[Tuple[float, float, float, Point]] = []
+        self.extents: Dict[Point, Tuple[int, Point, Point]] = {}
+        for point in points or ():
+            self.add(point)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, point: Point) -> bool:
+        key = self._key(point)
+        index = bisect_left(self._keys, key)
+        return index < len(self._keys) and self._keys[index] == key
+
+    def __iter__(self) -> Iterator[Point]:
+        # A snapshot, so points can be added or dropped while walking
+        return map(itemgetter(3), list(self._keys))
+
+    def add(self, point: Point) -> None:
+        if point not in self:
+            insort(self._keys, self._key(point))
+
+    def discard(self, point: Point) -> None:
+        key = self._key(point)
+        index = bisect_left(self._keys, key)
+        if index < len(self._keys) and self._keys[index] == key:
+            del self._keys[index]
+        self.extents.pop(point, None)
+
+    def forget_extents(self) -> None:
+        self.extents.clear()
+
+    @staticmethod
+    def _key(point: Point) -> Tuple[float, float, float, Point]:
+        return (point[1], point[2], point[0], point)
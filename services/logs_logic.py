@@ -0,0 +1,95 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from typing import Optional, Iterator, Dict, Any
+
+from data.database import SessionLocal, iter_logs
+
+# Number of log rows serialized into each streamed chunk
+EXPORT_CHUNK_ROWS = 500
+
+EXPORT_FIELDS = ["id", "timestamp", "userId", "actionType", "itemId", "itemName", "details"]
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv"
+}
+
+def to_export_record(log: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Map a log dict onto the field names used by the /logs API.
+    """
+    return {
+        "id": log["id"],
+        "timestamp": log["timestamp"],
+        "userId": log["user_id"],
+        "actionType": log["action_type"],
+        "itemId": log["item_id"],
+        "itemName": log["item_name"],
+        "details": log["details"]
+    }
+
+def export_logs(
+    export_format: str,
+    compress: bool = False,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    item_id: Optional[str] = None,
+    user_id: Optional[str] = None,
+    action_type: Optional[str] = None
+) -> Iterator[bytes]:
+    """
+    Stream matching logs as NDJSON or CSV, optionally gzip-compressed.
+    The generator owns its own session so it stays valid for the whole
+    lifetime of a streaming response.
+    """
+    compressor = zlib.compressobj(wbits=31) if compress else None
+    db = SessionLocal()
+    try:
+        for chunk in serialize_logs(
+            iter_logs(db, start_date, end_date, item_id, user_id, action_type),
+            export_format
+        ):
+            data = chunk.encode("utf-8")
+            if compressor:
+                data = compressor.compress(data)
+            if data:
+                yield data
+        
+        if compressor:
+            yield compressor.flush()
+    finally:
+        db.close()
+
+def serialize_logs(logs: Iterator[Dict[str, Any]], export_format: str) -> Iterator[str]:
+    """
+    Serialize logs into text chunks of EXPORT_CHUNK_ROWS rows each.
+    """
+    buffer = io.StringIO()
+    writer = None
+    
+    if export_format == "csv":
+        writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+        writer.writeheader()
+    
+    rows_in_chunk = 0
+    for log in logs:
+        record = to_export_record(log)
+        if writer:
+            record["details"] = json.dumps(record["details"]) if record["details"] is not None else ""
+            writer.writerow(record)
+        else:
+            buffer.write(json.dumps(record))
+            buffer.write("\n")
+        
+        rows_in_chunk += 1
+        if rows_in_chunk >= EXPORT_CHUNK_ROWS:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+            rows_in_chunk = 0
+    
+    if buffer.tell():
+        yield buffer.getvalue()
@@ -0,0 +1,270 @@
+import os
+import time
+from bisect import bisect_right
+from itertools import accumulate
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+# How long selecting the return manifest may take before the best selection
+# found so far is used
+RETURN_PLAN_BUDGET_MS = int(os.getenv("RETURN_PLAN_BUDGET_MS", "200"))
+
+# Value of an expired item relative to a used-up item of the same size
+EXPIRED_PRIORITY = float(os.getenv("RETURN_PLAN_EXPIRED_PRIORITY", "10"))
+
+# Weight shares tried when folding both capacities into one for bounds and ordering
+SURROGATE_STEPS = 21
+
+# Largest candidate count searched exhaustively; larger manifests are
+# improved by local search instead
+EXACT_SEARCH_ITEMS = 200
+
+# Nodes explored between two deadline checks
+DEADLINE_CHECK_NODES = 1024
+
+class ManifestSelection:
+    """
+    Items chosen for a return manifest.
+    `indices` point into the candidate list, in candidate order. `gap` is how
+    far the chosen value may be below the best possible one, as a share of
+    the upper bound on it; it is 0 when the selection is proven optimal.
+    """
+
+    def __init__(self, indices: List[int], value: float, upper_bound: float, exact: bool):
+        self.indices = indices
+        self.value = value
+        self.upper_bound = upper_bound
+        self.exact = exact
+
+    @property
+    def gap(self) -> float:
+        if self.exact or self.upper_bound <= 0:
+            return 0.0
+        return max(0.0, (self.upper_bound - self.value) / self.upper_bound)
+
+def item_values(weights: np.ndarray, volumes: np.ndarray, expired: np.ndarray,
+                max_weight: float, max_volume: float) -> np.ndarray:
+    """
+    Value of returning each item: the share of the weight and volume
+    capacity it clears, scaled up for expired items.
+    """
+    size = weights / max_weight if max_weight > 0 else np.zeros_like(weights)
+    if max_volume > 0:
+        size = size + volumes / max_volume
+    return size * np.where(expired, EXPIRED_PRIORITY, 1.0)
+
+def select_manifest(
+    weights: Sequence[float],
+    volumes: Sequence[float],
+    expired: Sequence[bool],
+    max_weight: float,
+    max_volume: Optional[float] = None,
+    budget_ms: int = RETURN_PLAN_BUDGET_MS
+) -> ManifestSelection:
+    """
+    Choose the items to return, maximizing total value within both the
+    weight and the volume capacity (a 2D 0/1 knapsack); `max_volume` None
+    means volume is not limited.
+    Both capacities are folded into one surrogate capacity, with the weight
+    share giving the lowest fractional bound. Greedy passes over every
+    weight share give a first selection, improved by swapping items in and
+    out. Up to EXACT_SEARCH_ITEMS candidates, a depth-first branch and bound
+    then searches for the optimum. Both stop when `budget_ms` runs out,
+    keeping the best selection so far and its gap to the bound.
+    """
+    deadline = time.perf_counter() + budget_ms / 1000
+    weights = np.asarray(weights, dtype=np.float64)
+    volumes = np.asarray(volumes, dtype=np.float64)
+    expired = np.asarray(expired, dtype=bool)
+    volume_limited = max_volume is not None
+    capacity_volume = max_volume if volume_limited else 0.0
+    if not volume_limited:
+        volumes = np.zeros_like(volumes)
+
+    values = item_values(weights, volumes, expired, max_weight, capacity_volume)
+    fits = (weights <= max_weight) & (volumes <= capacity_volume if volume_limited else True)
+    # Items taking no capacity at all always go
+    free = fits & (weights <= 0) & (volumes <= 0)
+    free_indices = np.flatnonzero(free).tolist()
+    candidates = np.flatnonzero(fits & ~free)
+
+    if len(candidates) == 0:
+        return ManifestSelection(free_indices, 0.0, 0.0, True)
+    if (weights[candidates].sum() <= max_weight
+            and (not volume_limited or volumes[candidates].sum() <= capacity_volume)):
+        return ManifestSelection(
+            sorted(free_indices + candidates.tolist()),
+            float(values[candidates].sum()), float(values[candidates].sum()), True
+        )
+
+    item_weights, item_volumes = weights[candidates], volumes[candidates]
+    volume_room = capacity_volume if volume_limited else float("inf")
+    weight_share = item_weights / max_weight if max_weight > 0 else np.zeros(len(candidates))
+    volume_share = item_volumes / capacity_volume if volume_limited and capacity_volume > 0 else np.zeros(len(candidates))
+    candidate_values = values[candidates]
+
+    # Greedy selection and fractional bound for each surrogate weighting
+    best_value, best_set = 0.0, []
+    upper_bound, best_alpha, best_order = float("inf"), 1.0, None
+    for alpha in np.linspace(0.0, 1.0, SURROGATE_STEPS) if volume_limited else [1.0]:
+        surrogate = surrogate_sizes(weight_share, volume_share, alpha)
+        order = np.argsort(-candidate_values / surrogate, kind="stable")
+        bound = fractional_bound(surrogate[order], candidate_values[order], 1.0)
+        if bound < upper_bound:
+            upper_bound, best_alpha, best_order = bound, alpha, order
+
+        value, chosen = greedy_fill(order, item_weights, item_volumes, candidate_values, max_weight, volume_room)
+        if value > best_value:
+            best_value, best_set = value, chosen
+
+    best_value, best_set = improve_by_swaps(weight_share, volume_share, candidate_values, best_set, deadline)
+    exact = False
+    if len(candidates) <= EXACT_SEARCH_ITEMS:
+        value, chosen, exact = branch_and_bound(
+            best_order, item_weights, item_volumes, candidate_values,
+            surrogate_sizes(weight_share, volume_share, best_alpha), best_alpha,
+            max_weight, volume_room, best_value, deadline
+        )
+        if chosen is not None:
+            best_value, best_set = value, chosen
+
+    indices = sorted(free_indices + candidates[best_set].tolist())
+    return ManifestSelection(indices, best_value, max(upper_bound, best_value), exact)
+
+def surrogate_sizes(weight_share: np.ndarray, volume_share: np.ndarray, alpha: float) -> np.ndarray:
+    """
+    Size of each item against one capacity of 1 standing for both: any
+    selection within both capacities is within this one for every alpha.
+    """
+    return np.maximum(alpha * weight_share + (1 - alpha) * volume_share, 1e-12)
+
+def fractional_bound(sizes: np.ndarray, values: np.ndarray, capacity: float) -> float:
+    """
+    Best value of a fractional knapsack over items already sorted by density.
+    """
+    filled = np.cumsum(sizes)
+    whole = int(np.searchsorted(filled, capacity, side="right"))
+    bound = float(values[:whole].sum())
+    if whole < len(sizes):
+        room = capacity - (filled[whole - 1] if whole else 0.0)
+        bound += float(values[whole]) * room / float(sizes[whole])
+    return bound
+
+def greedy_fill(order, weights, volumes, values, max_weight: float, max_volume: float):
+    """
+    Take items in `order` while both capacities allow.
+    """
+    weights, volumes, values = weights.tolist(), volumes.tolist(), values.tolist()
+    used_weight = used_volume = value = 0.0
+    chosen = []
+    for index in order.tolist():
+        weight, volume = weights[index], volumes[index]
+        if used_weight + weight <= max_weight and used_volume + volume <= max_volume:
+            used_weight += weight
+            used_volume += volume
+            value += values[index]
+            chosen.append(index)
+    return value, chosen
+
+def branch_and_bound(order, weights, volumes, values, surrogate, alpha: float,
+                     max_weight: float, max_volume: float, incumbent: float, deadline: float):
+    """
+    Depth-first search over take/skip decisions in surrogate density order,
+    pruning a branch when its fractional surrogate bound cannot beat the
+    incumbent. Returns (value, chosen, exact); chosen is None when nothing
+    better than `incumbent` was found.
+    """
+    order = order.tolist()
+    item_weights = weights[order].tolist()
+    item_volumes = volumes[order].tolist()
+    item_worth = values[order].tolist()
+    sizes = surrogate[order].tolist()
+    prefix_sizes = [0.0] + list(accumulate(sizes))
+    prefix_values = [0.0] + list(accumulate(item_worth))
+    count = len(order)
+    volume_limited = 0 < max_volume < float("inf")
+
+    def bound(position: int, used_weight: float, used_volume: float, value: float) -> float:
+        room = alpha * (1.0 - used_weight / max_weight if max_weight > 0 else 1.0)
+        room += (1 - alpha) * (1.0 - used_volume / max_volume if volume_limited else 1.0)
+        # Items position..whole-1 fit whole in the residual surrogate capacity
+        limit = prefix_sizes[position] + room
+        whole = min(bisect_right(prefix_sizes, limit) - 1, count)
+        total = value + prefix_values[whole] - prefix_values[position]
+        if whole < count:
+            total += item_worth[whole] * (limit - prefix_sizes[whole]) / sizes[whole]
+        return total
+
+    best_value, best_path = incumbent, None
+    # (position, used weight, used volume, value, taken positions as a linked list)
+    stack = [(0, 0.0, 0.0, 0.0, None)]
+    nodes = 0
+    while stack:
+        nodes += 1
+        if nodes % DEADLINE_CHECK_NODES == 0 and time.perf_counter() > deadline:
+            break
+        position, used_weight, used_volume, value, path = stack.pop()
+        if value > best_value + 1e-12:
+            best_value, best_path = value, path
+        if position == count or bound(position, used_weight, used_volume, value) <= best_value + 1e-12:
+            continue
+
+        # Skip is pushed first so the branch taking the item is explored first
+        stack.append((position + 1, used_weight, used_volume, value, path))
+        weight, volume = item_weights[position], item_volumes[position]
+        if used_weight + weight <= max_weight and used_volume + volume <= max_volume:
+            stack.append((
+                position + 1, used_weight + weight, used_volume + volume,
+                value + item_worth[position], (position, path)
+            ))
+
+    exact = not stack
+    if best_path is None:
+        return best_value, None, exact
+    chosen = []
+    while best_path is not None:
+        position, best_path = best_path
+        chosen.append(order[position])
+    return best_value, chosen, exact
+
+def improve_by_swaps(weight_share, volume_share, values, chosen, deadline: float):
+    """
+    Local search from `chosen`: replace a chosen item with the most valuable
+    unchosen one that still fits in its place, then add whatever fits in the
+    room left, until no swap helps or the deadline passes.
+    Returns (value, chosen).
+    """
+    selected = np.zeros(len(values), dtype=bool)
+    selected[chosen] = True
+    weight_room = 1.0 - weight_share[selected].sum()
+    volume_room = 1.0 - volume_share[selected].sum()
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+        # Least valuable chosen items have the most to gain from a swap
+        for index in sorted(np.flatnonzero(selected).tolist(), key=lambda index: values[index]):
+            if time.perf_counter() > deadline:
+                break
+            fits = (
+                ~selected &
+                (weight_share <= weight_share[index] + weight_room) &
+                (volume_share <= volume_share[index] + volume_room)
+            )
+            gains = np.where(fits, values - values[index], -np.inf)
+            best = int(np.argmax(gains))
+            if gains[best] <= 1e-12:
+                continue
+
+            selected[index], selected[best] = False, True
+            weight_room += weight_share[index] - weight_share[best]
+            volume_room += volume_share[index] - volume_share[best]
+            improved = True
+            for other in np.flatnonzero(~selected & (weight_share <= weight_room) & (volume_share <= volume_room)).tolist():
+                if weight_share[other] <= weight_room and volume_share[other] <= volume_room:
+                    selected[other] = True
+                    weight_room -= weight_share[other]
+                    volume_room -= volume_share[other]
+
+    chosen = np.flatnonzero(selected).tolist()
+    return float(values[chosen].sum()), chosen
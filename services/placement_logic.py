@@ -1,41 +1,184 @@
+import os
+import threading
+from datetime import datetime
+from itertools import permutations
+from sqlalchemy.orm import Session
+from typing import Optional, Dict, Any, List
+
+from models.placement_model import (
+    Coordinates,
+    Position,
+    PlacementStep,
+    PlacementRecommendation,
+    PlacementResponse,
+    BatchPlacementRequest,
+    BatchPlacementResult,
+    BatchPlacementResponse,
+    UnplacedItem
+)
+from data.database import (
+    get_item_by_id,
+    get_container_by_id,
+    get_all_containers,
+    get_items_by_container,
+    get_items_by_ids,
+    get_items_in_region,
+    update_item_position,
+    save_item_positions,
+    log_actions,
+    SessionLocal,
+    ITEM_PLACEMENT_COLUMNS
+)
+from services.spatial_grid import SpatialGrid
+from services.extreme_points import ExtremePoints
+from services.placement_store import PlacementStore
+from services.search_cache import search_cache
+
+# Grid resolution used for each container's collision index
+GRID_CELLS_PER_AXIS = 16
+
+# Size of the probe box used to test whether an extreme point is covered
+POINT_EPSILON = 1e-6
+
 database = {
     "items": {},       # Use dict for quick lookups (O(1) access)
-    "containers": {}   # Store container dimensions and items
+    "containers": {}   # Store container dimensions, items, collision index and free space
 }
 
-def place_item(container_id, item_id, position):
+# Requests run on several threads; the in-memory models are updated under this lock
+model_lock = threading.RLock()
+
+# Every change to the models is journaled so a restart does not rebuild them from SQL
+store = PlacementStore(
+    os.getenv("PLACEMENT_SNAPSHOT_PATH", "./placement.snapshot"),
+    os.getenv("PLACEMENT_WAL_PATH", "./placement.wal"),
+    int(os.getenv("PLACEMENT_WAL_COMPACT_ENTRIES", "10000"))
+)
+# Stored models of containers not built in memory yet
+stored_state = store.load()
+
+def register_container(container_id, width, depth, height, zone=None, max_weight=0.0):
+    """Registers a container with an empty collision index and free-space model."""
+    container = {
+        "containerId": container_id,
+        "zone": zone,
+        "width": width,
+        "depth": depth,
+        "height": height,
+        "max_weight": max_weight or 0.0,
+        "used_weight": 0.0,
+        "used_volume": 0.0,
+        "generation": 0,   # bumped on every change to the container's contents
+        "items": {},   # itemId -> item, for O(1) removal
+        "index": SpatialGrid(max(width, depth, height) / GRID_CELLS_PER_AXIS or 1),
+        # Extreme points: candidate corners where the next item can be placed
+        "extreme_points": ExtremePoints([(0.0, 0.0, 0.0)])
+    }
+    database["containers"][container_id] = container
+    return container
+
+def place_item(container_id, item_id, position, weight=0.0, db: Optional[Session] = None):
     """Places an item in a container only if there's enough space and no collision."""
     
-    if container_id not in database["containers"]:
-        return False, "Container does not exist"
-    
-    container = database["containers"][container_id]
+    with model_lock:
+        container = database["containers"].get(container_id)
+        if container is None and db is not None:
+            container = load_container(db, container_id)
+        if container is None:
+            return False, "Container does not exist"
+        return place_in_container(container, item_id, position, weight, db)
+
+def place_in_container(container, item_id, position, weight=0.0, db: Optional[Session] = None):
+    """Checks and records a placement, writing it through to the database."""
 
     # Ensure the item fits in the container dimensions
     item_width = position.endCoordinates.width - position.startCoordinates.width
     item_depth = position.endCoordinates.depth - position.startCoordinates.depth
     item_height = position.endCoordinates.height - position.startCoordinates.height
 
+    if item_width < 0 or item_depth < 0 or item_height < 0:
+        return False, "startCoordinates must not exceed endCoordinates"
+
     if (item_width > container["width"] or 
         item_depth > container["depth"] or 
         item_height > container["height"]):
         return False, "Item does not fit in the container"
 
-    # Ensure no collision with existing items
-    for existing_item in container["items"]:
-        if is_overlapping(existing_item["position"], position):
-            return False, "Collision detected with another item"
+    # Ensure no collision with existing items (the item's own old spot is ignored)
+    box = to_box(position)
+    if container["index"].any_overlap(box, exclude=item_id):
+        return False, "Collision detected with another item"
+
+    write_through(db, update_item_position, item_id, container["containerId"], box_to_db_position(box))
+    previous = database["items"].get(item_id)
+    search_cache.invalidate(container["containerId"], previous["containerId"] if previous else None)
+    item = add_to_container(container, item_id, box, weight)
+    journal([place_entry(item_id, container["containerId"], box, item["weight"])])
+    return True, item
+
+def add_to_container(container, item_id, box, weight=0.0):
+    """Records an item in a container's index and free-space model without checks."""
+    # Moving an already placed item frees its previous spot
+    if item_id in database["items"]:
+        remove_from_model(item_id)
 
-    # Place the item
+    start, end = box
     item = {
         "itemId": item_id,
-        "containerId": container_id,
-        "position": position.dict()
+        "containerId": container["containerId"],
+        "position": {
+            "startCoordinates": dict(zip(("width", "depth", "height"), start)),
+            "endCoordinates": dict(zip(("width", "depth", "height"), end))
+        },
+        "weight": weight or 0.0
     }
     
     database["items"][item_id] = item  # Store in dict for O(1) lookup
-    container["items"].append(item)  # Add to the container
-    return True, item
+    container["items"][item_id] = item  # Add to the container
+    container["index"].insert(item_id, box)
+    container["used_weight"] += item["weight"]
+    container["used_volume"] += box_volume(box)
+    container["generation"] += 1
+    update_extreme_points(container, box)
+    return item
+
+def update_extreme_points(container, box):
+    """Replaces the used corner with the three corners the new box exposes."""
+    start, end = box
+    points = container["extreme_points"]
+    points.discard(start)
+    limits = (container["width"], container["depth"], container["height"])
+    for axis in range(3):
+        point = list(start)
+        point[axis] = end[axis]
+        if point[axis] < limits[axis]:
+            points.add(tuple(point))
+
+def to_box(position):
+    """Convert a Position into a ((start), (end)) box for the collision index."""
+    start = position.startCoordinates
+    end = position.endCoordinates
+    return (
+        (start.width, start.depth, start.height),
+        (end.width, end.depth, end.height)
+    )
+
+def box_to_db_position(box):
+    """Convert a box into the {"start": ..., "end": ...} form stored in the database."""
+    start, end = box
+    return {
+        "start": dict(zip(("width", "depth", "height"), start)),
+        "end": dict(zip(("width", "depth", "height"), end))
+    }
+
+def db_position_to_box(position):
+    """Convert a stored {"start": ..., "end": ...} position into a box."""
+    start = position["start"]
+    end = position["end"]
+    return (
+        (start["width"], start["depth"], start["height"]),
+        (end["width"], end["depth"], end["height"])
+    )
 
 def is_overlapping(pos1, pos2):
     """Check if two positions overlap in 3D space."""
@@ -54,11 +197,464 @@ def find_item(item_id=None, item_name=None):
         return database["items"][item_id]
     return None  # More logic can be added for name-based search
 
-def retrieve_item(item_id):
+def retrieve_item(item_id, db: Optional[Session] = None):
     """Retrieve (remove) an item efficiently."""
+    with model_lock:
+        if item_id not in database["items"]:
+            return False
+        write_through(db, update_item_position, item_id, None, None)
+        search_cache.invalidate(database["items"][item_id]["containerId"])
+        remove_from_model(item_id)
+        journal([remove_entry(item_id)])
+        return True
+
+def remove_from_model(item_id):
+    """Drops an item from its container's index and free-space model."""
     if item_id in database["items"]:
         item = database["items"].pop(item_id)  # O(1) removal
-        database["containers"][item["containerId"]]["items"].remove(item)
+        container = database["containers"][item["containerId"]]
+        container["items"].pop(item_id, None)
+        box = container["index"].boxes.get(item_id)
+        container["index"].delete(item_id)
+        container["used_weight"] -= item.get("weight", 0.0)
+        container["generation"] += 1
+        if box:
+            container["used_volume"] -= box_volume(box)
+            # The freed corner becomes available again, and free space grew
+            container["extreme_points"].add(box[0])
+            container["extreme_points"].forget_extents()
         return True
     return False
 
+def load_container(db: Session, container_id: str, reload: bool = False):
+    """
+    Get a container's in-memory model, building it from the stored snapshot
+    the first time, or from the database when it was never stored (or when
+    `reload` is set). Returns None for unknown containers.
+    """
+    if container_id in database["containers"] and not reload:
+        return database["containers"][container_id]
+
+    meta = stored_state.meta(container_id)
+    if meta is not None and not reload:
+        width, depth, height, zone, max_weight = meta
+        container = register_container(container_id, width, depth, height, zone=zone, max_weight=max_weight)
+        for item_id, box, weight in list(stored_state.records(container_id)):
+            add_to_container(container, item_id, box, weight)
+        stored_state.forget(container_id)
+        return container
+
+    container_row = get_container_by_id(db, container_id)
+    if not container_row or not container_row.get("dimensions"):
+        return None
+
+    if container_id in database["containers"]:
+        for item_id in list(database["containers"][container_id]["items"]):
+            database["items"].pop(item_id, None)
+
+    dimensions = container_row["dimensions"]
+    container = register_container(
+        container_id,
+        dimensions["width"],
+        dimensions["depth"],
+        dimensions["height"],
+        zone=container_row.get("zone"),
+        max_weight=container_row.get("max_weight")
+    )
+    for item in get_items_by_container(db, container_id):
+        if item["position"]:
+            add_to_container(container, item["id"], db_position_to_box(item["position"]), item.get("weight"))
+    journal([container_entry(container)])
+    stored_state.forget(container_id)
+    return container
+
+def record_item_position(item_id: str, container_id: str, position: Dict[str, Any], weight: float = 0.0) -> None:
+    """
+    Mirror a position already written to the database into a loaded container
+    model so its free space stays current without being rebuilt.
+    """
+    with model_lock:
+        container = database["containers"].get(container_id)
+        if container is None:
+            # Not loaded yet; the stored model picks the move up from the journal
+            remove_from_model(item_id)
+            box = db_position_to_box(position)
+            journal([place_entry(item_id, container_id, box, weight or 0.0)])
+            return
+        box = db_position_to_box(position)
+        item = add_to_container(container, item_id, box, weight)
+        journal([place_entry(item_id, container_id, box, item["weight"])])
+
+def forget_items(item_ids: List[str]) -> None:
+    """
+    Drop items removed from the database from the in-memory models.
+    """
+    with model_lock:
+        for item_id in item_ids:
+            remove_from_model(item_id)
+        journal([remove_entry(item_id) for item_id in item_ids])
+
+def journal(entries: List[Dict[str, Any]]) -> None:
+    """
+    Durably record model changes before they are acknowledged.
+    Entries are also applied to containers still only held in the stored
+    state, so an item moved out of one is not resurrected when it is built.
+    """
+    store.append(entries)
+    for entry in entries:
+        stored_state.apply(entry)
+
+def place_entry(item_id, container_id, box, weight):
+    return {"op": "place", "item": item_id, "container": container_id, "box": [*box[0], *box[1]], "weight": weight}
+
+def remove_entry(item_id):
+    return {"op": "remove", "item": item_id}
+
+def container_entry(container):
+    """Full contents of a container, replacing whatever was stored for it."""
+    index = container["index"]
+    return {
+        "op": "container",
+        "id": container["containerId"],
+        "meta": [container["width"], container["depth"], container["height"], container["zone"], container["max_weight"]],
+        "items": [
+            [item_id, *index.boxes[item_id][0], *index.boxes[item_id][1], item["weight"]]
+            for item_id, item in container["items"].items()
+        ]
+    }
+
+def write_through(db: Optional[Session], func, *args):
+    """Run a database write on `db`, or on a short-lived session when none is given."""
+    if db is not None:
+        return func(db, *args)
+    session = SessionLocal()
+    try:
+        return func(session, *args)
+    finally:
+        session.close()
+
+def save_snapshot() -> None:
+    """
+    Fold the journal into a fresh snapshot (used at shutdown).
+    """
+    store.compact()
+
+def find_free_position(container, size, item_id=None, weight=0.0):
+    """
+    Find the best free spot for a box of `size` (width, depth, height).
+    Extreme points are tried front-most, then lowest, then left-most, so items
+    end up close to the open face; every orientation of the item is tried.
+    Orientations longer than a point's residual free extent are skipped
+    without probing the grid. Returns a box or None.
+    """
+    current = database["items"].get(item_id)
+    own_weight = current["weight"] if current and current["containerId"] == container["containerId"] else 0.0
+    if container["max_weight"] and container["used_weight"] - own_weight + (weight or 0.0) > container["max_weight"]:
+        return None
+
+    volume = size[0] * size[1] * size[2]
+    own_volume = box_volume(container["index"].boxes[item_id]) if item_id in container["index"] else 0.0
+    if container["used_volume"] - own_volume + volume > container["width"] * container["depth"] * container["height"]:
+        return None
+
+    # Extents are cached for the container as it is; an item moving within
+    # it may reuse its own spot, so it probes every point instead
+    moving = item_id in container["index"]
+    points = container["extreme_points"]
+    orientations = list(dict.fromkeys(permutations(size)))
+    smallest, middle, largest = sorted(size)
+    for point in points:
+        if moving:
+            extent = free_extent(container, point, item_id)
+            if extent is None:
+                points.discard(point)
+                continue
+        else:
+            cached = points.extents.get(point) or cache_free_extent(container, point)
+            if cached is None:
+                continue
+            generation, extent, reach = cached
+            # No orientation fits unless each sorted side fits its sorted extent
+            if reach[0] < smallest or reach[1] < middle or reach[2] < largest:
+                continue
+
+        for orientation in orientations:
+            if any(orientation[axis] > extent[axis] for axis in range(3)):
+                continue
+            box = (point, tuple(point[axis] + orientation[axis] for axis in range(3)))
+            if not container["index"].any_overlap(box, exclude=item_id):
+                return box
+            if not moving and generation != container["generation"]:
+                # The extent predates the item in the way; tighten it
+                cached = cache_free_extent(container, point)
+                if cached is None:
+                    break
+                generation, extent, reach = cached
+    return None
+
+def cache_free_extent(container, point):
+    """
+    Compute and cache the residual free extent of an extreme point as
+    (generation, extent, sorted extent). Points found covered are dropped.
+    """
+    points = container["extreme_points"]
+    extent = free_extent(container, point)
+    if extent is None:
+        points.discard(point)
+        return None
+    cached = (container["generation"], extent, tuple(sorted(extent)))
+    points.extents[point] = cached
+    return cached
+
+def free_extent(container, point, item_id=None):
+    """
+    How far free space reaches from `point` along each axis before another
+    item or the container wall, or None when the point is inside an item.
+    A box cornered at the point cannot be longer than this on any axis.
+    """
+    limits = (container["width"], container["depth"], container["height"])
+    index = container["index"]
+    extent = []
+    for axis in range(3):
+        # A thin beam from the point along the axis
+        end = [value + POINT_EPSILON for value in point]
+        end[axis] = limits[axis]
+        reach = limits[axis]
+        for key in index.query_overlap((point, tuple(end)), exclude=item_id):
+            start = index.boxes[key][0][axis]
+            if start <= point[axis]:
+                # A corner swallowed by another item can never take a new one
+                return None
+            reach = min(reach, start)
+        extent.append(reach - point[axis])
+    return tuple(extent)
+
+def box_volume(box):
+    """Volume of a ((start), (end)) box."""
+    start, end = box
+    return (end[0] - start[0]) * (end[1] - start[1]) * (end[2] - start[2])
+
+def recommend_placement(db: Session, item_id: str, container_id: Optional[str] = None) -> PlacementResponse:
+    """
+    Recommend where to place an item: the requested container if given,
+    otherwise containers in the item's zone first, then any other container.
+    """
+    item = get_item_by_id(db, item_id)
+    if not item:
+        return PlacementResponse(success=False, message=f"Item {item_id} not found")
+    if not item["position"]:
+        return PlacementResponse(success=False, message=f"Dimensions of item {item_id} are unknown")
+
+    start, end = db_position_to_box(item["position"])
+    size = tuple(end[axis] - start[axis] for axis in range(3))
+
+    if container_id:
+        candidates = [container_id]
+    else:
+        containers = sorted(get_all_containers(db), key=lambda c: c["zone"] != item["zone"])
+        candidates = [container["id"] for container in containers]
+
+    for candidate_id in candidates:
+        with model_lock:
+            container = load_container(db, candidate_id)
+            if container is None:
+                continue
+            box = find_free_position(container, size, item_id, item["weight"])
+
+        # Checked outside the lock so other placements are not held up by the query
+        if box and not is_free_in_database(db, candidate_id, box, item_id):
+            # Another worker changed this container; rebuild it and retry once
+            with model_lock:
+                container = load_container(db, candidate_id, reload=True)
+                box = find_free_position(container, size, item_id, item["weight"]) if container else None
+        if box:
+            return PlacementResponse(
+                success=True,
+                recommendation=build_recommendation(item, container, box)
+            )
+
+    if container_id and container_id not in database["containers"]:
+        return PlacementResponse(success=False, message=f"Container {container_id} not found")
+    return PlacementResponse(success=True, message="No container has room for this item")
+
+def is_free_in_database(db: Session, container_id: str, box, item_id: str) -> bool:
+    """
+    Confirm a box is still free according to the database.
+    """
+    start = dict(zip(("width", "depth", "height"), box[0]))
+    end = dict(zip(("width", "depth", "height"), box[1]))
+    return all(other["id"] == item_id for other in get_items_in_region(db, container_id, start, end))
+
+def build_recommendation(item, container, box) -> PlacementRecommendation:
+    """
+    Describe a chosen spot for the API response.
+    """
+    start, end = box
+    zone = container["zone"]
+    if zone == item["zone"]:
+        reason = f"Free space in the item's preferred zone {zone}, closest to the open face"
+    else:
+        reason = f"No room in preferred zone {item['zone']}; free space found in zone {zone}"
+
+    position = Position(
+        startCoordinates=Coordinates(width=start[0], depth=start[1], height=start[2]),
+        endCoordinates=Coordinates(width=end[0], depth=end[1], height=end[2])
+    )
+    return PlacementRecommendation(
+        itemId=item["id"],
+        itemName=item["name"],
+        containerId=container["containerId"],
+        zone=zone,
+        position=position,
+        reason=reason,
+        steps=[
+            PlacementStep(step=1, description=f"Go to container {container['containerId']} in zone {zone}"),
+            PlacementStep(
+                step=2,
+                description=(
+                    f"Place {item['name']} with its corner at "
+                    f"({start[0]}, {start[1]}, {start[2]})"
+                )
+            )
+        ]
+    )
+
+def place_batch(db: Session, request: BatchPlacementRequest) -> BatchPlacementResponse:
+    """
+    Pack a batch of incoming items across all containers in one pass.
+    Items are taken highest priority first, then largest volume first
+    (first-fit decreasing); each goes into the first container with room,
+    preferring its zone. All positions are committed in one transaction.
+    Items already in inventory keep their stored weight and name.
+    """
+    items = sorted(
+        request.items,
+        key=lambda item: (-item.priority, -(item.width * item.depth * item.height))
+    )
+    containers = get_all_containers(db)
+    stored = get_items_by_ids(db, [item.itemId for item in items], ITEM_PLACEMENT_COLUMNS)
+
+    placements = []
+    results = []
+    unplaced = []
+    seen = set()
+    touched = set()
+    # container_id -> (generation, [(sorted dimensions, weight)]) of items that did not fit;
+    # anything at least as large and heavy cannot fit either until the container changes
+    failed = {}
+
+    with model_lock:
+        for item in items:
+            if item.itemId in seen:
+                unplaced.append(UnplacedItem(itemId=item.itemId, reason="Duplicate itemId in batch"))
+                continue
+            seen.add(item.itemId)
+            weight = (stored[item.itemId]["weight"] or 0.0) if item.itemId in stored else item.weight
+
+            if item.preferredZone:
+                candidates = sorted(containers, key=lambda c: c["zone"] != item.preferredZone)
+            else:
+                candidates = containers
+
+            for row in candidates:
+                container = load_container(db, row["id"])
+                if container is None:
+                    continue
+
+                dimensions = sorted((item.width, item.depth, item.height))
+                generation, failures = failed.get(row["id"], (None, []))
+                if generation == container["generation"] and any(
+                    weight >= lighter and all(a >= b for a, b in zip(dimensions, smaller))
+                    for smaller, lighter in failures
+                ):
+                    continue
+
+                box = find_free_position(container, (item.width, item.depth, item.height), item.itemId, weight)
+                if box is None:
+                    if generation != container["generation"]:
+                        failures = []
+                    failures.append((dimensions, weight))
+                    failed[row["id"]] = (container["generation"], failures)
+                    continue
+
+                previous = database["items"].get(item.itemId)
+                if previous:
+                    touched.add(previous["containerId"])
+                touched.add(row["id"])
+                add_to_container(container, item.itemId, box, weight)
+
+                placements.append(build_batch_placement(item, row["id"], box, stored.get(item.itemId)))
+                results.append(
+                    BatchPlacementResult(
+                        itemId=item.itemId,
+                        containerId=row["id"],
+                        position=Position(
+                            startCoordinates=Coordinates(width=box[0][0], depth=box[0][1], height=box[0][2]),
+                            endCoordinates=Coordinates(width=box[1][0], depth=box[1][1], height=box[1][2])
+                        )
+                    )
+                )
+                break
+            else:
+                unplaced.append(UnplacedItem(itemId=item.itemId, reason="No container has room for this item"))
+
+        try:
+            save_item_positions(db, placements)
+        except Exception as e:
+            # Nothing was written; drop the tentative placements from memory
+            for container_id in touched:
+                load_container(db, container_id, reload=True)
+            return BatchPlacementResponse(success=False, message=str(e))
+
+        search_cache.invalidate(*touched)
+        journal([
+            place_entry(placement["id"], placement["container_id"], db_position_to_box(placement["position"]), placement["weight"] or 0.0)
+            for placement in placements
+        ])
+
+    log_actions(db, [
+        {
+            "action_type": "placement",
+            "user_id": request.userId or "system",
+            "item_id": placement["id"],
+            "item_name": placement.get("name"),
+            "timestamp": request.timestamp,
+            "details": {"toContainer": placement["container_id"]}
+        }
+        for placement in placements
+    ])
+
+    return BatchPlacementResponse(success=True, placements=results, unplaced=unplaced)
+
+def build_batch_placement(item, container_id, box, stored=None) -> Dict[str, Any]:
+    """
+    Build the row written for a packed item; the extra fields are only used
+    when the item is new to the inventory. `stored` is the item's existing
+    row, whose name and weight win over the request's.
+    """
+    expiry_date = None
+    if item.expiryDate:
+        try:
+            expiry_date = datetime.fromisoformat(item.expiryDate.replace('Z', '+00:00')).replace(tzinfo=None)
+        except ValueError:
+            pass
+
+    if stored is not None:
+        return {
+            "id": item.itemId,
+            "name": stored["name"],
+            "container_id": container_id,
+            "position": box_to_db_position(box),
+            "weight": stored["weight"]
+        }
+
+    return {
+        "id": item.itemId,
+        "name": item.name or item.itemId,
+        "container_id": container_id,
+        "zone": item.preferredZone,
+        "position": box_to_db_position(box),
+        "expiry_date": expiry_date,
+        "max_uses": item.usageLimit,
+        "weight": item.weight
+    }
@@ -0,0 +1,280 @@
+import json
+import logging
+import os
+import pickle
+import threading
+from array import array
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX platforms
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# (item_id, ((start), (end)), weight)
+Record = Tuple[str, Tuple[Tuple[float, float, float], Tuple[float, float, float]], float]
+# (width, depth, height, zone, max_weight)
+Meta = Tuple[float, float, float, Optional[str], float]
+
+SNAPSHOT_FORMAT = 1
+
+class PlacementState:
+    """
+    Placement models as stored on disk: a snapshot plus the write-ahead log
+    entries recorded since. Containers are materialized one at a time, so
+    loading the files at startup does not build per-item structures.
+    """
+
+    def __init__(self, snapshot: Dict[str, tuple]):
+        # container_id -> (meta, ids, boxes array('d') of 6 per item, weights array('d'))
+        self.snapshot = snapshot
+        # container_id -> (seq, meta, records) from "container" log entries
+        self.replaced: Dict[str, Tuple[int, Meta, List[Record]]] = {}
+        # item_id -> (seq, container_id or None, box, weight) from later log entries
+        self.overrides: Dict[str, Tuple[int, Optional[str], Any, float]] = {}
+        self.seq = 0
+
+    def apply(self, entry: Dict[str, Any]) -> None:
+        """
+        Apply one write-ahead log entry.
+        """
+        self.seq += 1
+        op = entry["op"]
+        if op == "container":
+            records = [(row[0], (tuple(row[1:4]), tuple(row[4:7])), row[7]) for row in entry["items"]]
+            self.replaced[entry["id"]] = (self.seq, tuple(entry["meta"]), records)
+            for item_id, box, weight in records:
+                self.overrides[item_id] = (self.seq, entry["id"], box, weight)
+        elif not self.snapshot and not self.replaced:
+            # No stored container left for a move to affect
+            return
+        elif op == "place":
+            box = entry["box"]
+            self.overrides[entry["item"]] = (
+                self.seq, entry["container"], (tuple(box[0:3]), tuple(box[3:6])), entry["weight"]
+            )
+        elif op == "remove":
+            self.overrides[entry["item"]] = (self.seq, None, None, 0.0)
+
+    def container_ids(self) -> List[str]:
+        return list(set(self.snapshot) | set(self.replaced))
+
+    def meta(self, container_id: str) -> Optional[Meta]:
+        if container_id in self.replaced:
+            return self.replaced[container_id][1]
+        if container_id in self.snapshot:
+            return self.snapshot[container_id][0]
+        return None
+
+    def records(self, container_id: str) -> Iterator[Record]:
+        """
+        Current contents of a container: its base (the latest full
+        "container" entry, else the snapshot) with newer moves applied.
+        """
+        if container_id in self.replaced:
+            base_seq, _, base = self.replaced[container_id]
+        elif container_id in self.snapshot:
+            base_seq = 0
+            base = iter_snapshot_records(self.snapshot[container_id])
+        else:
+            return
+
+        overrides = self.overrides
+        for record in base:
+            override = overrides.get(record[0])
+            if override is None or override[0] <= base_seq:
+                yield record
+
+        for item_id, (seq, override_container, box, weight) in overrides.items():
+            if seq > base_seq and override_container == container_id:
+                yield (item_id, box, weight)
+
+    def forget(self, container_id: str) -> None:
+        """
+        Drop a container once it has been built in memory.
+        """
+        self.snapshot.pop(container_id, None)
+        self.replaced.pop(container_id, None)
+        if not self.snapshot and not self.replaced:
+            # Every container is built; later moves only matter to the files
+            self.overrides.clear()
+
+def iter_snapshot_records(stored: tuple) -> Iterator[Record]:
+    _, ids, boxes, weights = stored
+    for index, item_id in enumerate(ids):
+        offset = index * 6
+        yield (
+            item_id,
+            (tuple(boxes[offset:offset + 3]), tuple(boxes[offset + 3:offset + 6])),
+            weights[index]
+        )
+
+def pack_records(meta: Meta, records: Iterator[Record]) -> tuple:
+    ids = []
+    boxes = array("d")
+    weights = array("d")
+    for item_id, (start, end), weight in records:
+        ids.append(item_id)
+        boxes.extend(start)
+        boxes.extend(end)
+        weights.append(weight or 0.0)
+    return (meta, ids, boxes, weights)
+
+class PlacementStore:
+    """
+    Durable storage for the placement models: a compact snapshot file plus
+    an append-only write-ahead log shared by all workers. Every change is
+    appended and fsynced before it is acknowledged. Once the log grows past
+    `compact_after` entries it is folded into a new snapshot in the background.
+    """
+
+    def __init__(self, snapshot_path: str, wal_path: str, compact_after: int = 10000):
+        self.snapshot_path = snapshot_path
+        self.wal_path = wal_path
+        self.compacting_path = wal_path + ".compacting"
+        self.lock_path = wal_path + ".lock"
+        # Held for a whole compaction, so only one worker folds the log at a time
+        self.compaction_lock_path = wal_path + ".compaction.lock"
+        self.compact_after = compact_after
+        self._appended = 0
+        self._compaction: Optional[threading.Thread] = None
+        self._local_lock = threading.Lock()
+
+    def load(self) -> PlacementState:
+        """
+        Read the snapshot and replay the log written since it was taken.
+        """
+        with _FileLock(self.compaction_lock_path):
+            state = PlacementState(self._read_snapshot())
+            for path in (self.compacting_path, self.wal_path):
+                for entry in self._read_wal(path):
+                    state.apply(entry)
+        return state
+
+    def append(self, entries: List[Dict[str, Any]]) -> None:
+        """
+        Durably append log entries.
+        """
+        if not entries:
+            return
+        data = "".join(json.dumps(entry, separators=(",", ":")) + "\n" for entry in entries)
+        with self._file_lock():
+            with open(self.wal_path, "a", encoding="utf-8") as wal:
+                wal.write(data)
+                wal.flush()
+                os.fsync(wal.fileno())
+
+        # A full container entry costs as much to replay as its items
+        self._appended += sum(len(entry.get("items", ())) or 1 for entry in entries)
+        if self._appended >= self.compact_after:
+            self._appended = 0
+            self.compact_in_background()
+
+    def compact_in_background(self) -> None:
+        with self._local_lock:
+            if self._compaction is None or not self._compaction.is_alive():
+                self._compaction = threading.Thread(target=self.compact, name="placement-compaction", daemon=True)
+                self._compaction.start()
+
+    def compact(self) -> None:
+        """
+        Fold the write-ahead log into a new snapshot.
+        The log is moved aside first, so appends carry on into a fresh log
+        while the snapshot is rewritten. Compactions (and loads) in every
+        worker take turns on a file lock, so none folds or deletes a log
+        another one is still reading.
+        """
+        try:
+            with _FileLock(self.compaction_lock_path):
+                self._compact()
+        except Exception:
+            logger.exception("Placement snapshot compaction failed")
+
+    def _compact(self) -> None:
+        # Callers hold the compaction lock: nothing else touches the
+        # compacting log or the snapshot until it is folded and removed
+        with self._file_lock():
+            if os.path.exists(self.wal_path):
+                if os.path.exists(self.compacting_path):
+                    # A previous compaction was interrupted; keep its older entries first
+                    self._append_file(self.compacting_path, self.wal_path)
+                else:
+                    os.replace(self.wal_path, self.compacting_path)
+            if not os.path.exists(self.compacting_path):
+                return
+
+        state = PlacementState(self._read_snapshot())
+        for entry in self._read_wal(self.compacting_path):
+            state.apply(entry)
+
+        snapshot = {}
+        for container_id in state.container_ids():
+            meta = state.meta(container_id)
+            if meta is not None:
+                snapshot[container_id] = pack_records(meta, state.records(container_id))
+
+        temp_path = self.snapshot_path + ".tmp"
+        with open(temp_path, "wb") as file:
+            pickle.dump({"format": SNAPSHOT_FORMAT, "containers": snapshot}, file, protocol=pickle.HIGHEST_PROTOCOL)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, self.snapshot_path)
+        os.remove(self.compacting_path)
+
+    def _read_snapshot(self) -> Dict[str, tuple]:
+        try:
+            with open(self.snapshot_path, "rb") as file:
+                data = pickle.load(file)
+        except FileNotFoundError:
+            return {}
+        except Exception:
+            logger.exception("Ignoring unreadable placement snapshot %s", self.snapshot_path)
+            return {}
+        if data.get("format") != SNAPSHOT_FORMAT:
+            return {}
+        return data["containers"]
+
+    def _read_wal(self, path: str) -> Iterator[Dict[str, Any]]:
+        try:
+            with open(path, encoding="utf-8") as wal:
+                for line in wal:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        # Torn final write from a crash
+                        logger.warning("Skipping corrupt placement log line in %s", path)
+        except FileNotFoundError:
+            return
+
+    def _append_file(self, target: str, source: str) -> None:
+        with open(source, encoding="utf-8") as src, open(target, "a", encoding="utf-8") as dst:
+            dst.write(src.read())
+            dst.flush()
+            os.fsync(dst.fileno())
+        os.remove(source)
+
+    def _file_lock(self):
+        return _FileLock(self.lock_path)
+
+class _FileLock:
+    """
+    Exclusive lock shared between worker processes (no-op without fcntl).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file = None
+
+    def __enter__(self):
+        if fcntl is not None:
+            self.file = open(self.path, "a")
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if self.file is not None:
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+            self.file.close()
+        return False
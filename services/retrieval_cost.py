@@ -0,0 +1,153 @@
+import heapq
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from services.spatial_grid import SpatialGrid
+
+# Grid resolution of the face-projection index used by the sweep
+GRID_CELLS_PER_AXIS = 16
+
+class RetrievalPlan:
+    """
+    Retrieval costs for one container.
+    `blockers[item_id]` lists every item that has to be set aside before the
+    item can be taken out through the open face (depth 0), blockers of
+    blockers included, in the order they must be removed. The retrieval
+    cost of an item is the length of that list.
+    """
+
+    def __init__(self, items: Dict[str, Mapping[str, Any]], blockers: Dict[str, List[str]]):
+        self.items = items
+        self.blockers = blockers
+
+    def cost(self, item_id: str) -> int:
+        return len(self.blockers.get(item_id, ()))
+
+    def blocking_items(self, item_id: str) -> List[Mapping[str, Any]]:
+        return [self.items[blocker_id] for blocker_id in self.blockers.get(item_id, ())]
+
+    def removal_order(self, item_ids: Iterable[str]) -> List[str]:
+        """
+        Everything to take out to reach all of `item_ids` (themselves
+        included), each item once even when it blocks several of them,
+        front-most first so every item comes after its blockers.
+        """
+        needed = set()
+        for item_id in item_ids:
+            needed.add(item_id)
+            needed.update(self.blockers.get(item_id, ()))
+        return sorted(needed, key=lambda item_id: (self.depth(item_id), item_id))
+
+    def depth(self, item_id: str) -> float:
+        item = self.items.get(item_id)
+        if not item or not item["position"]:
+            return 0.0
+        return item["position"]["start"]["depth"]
+
+def build_retrieval_plan(items: List[Mapping[str, Any]]) -> RetrievalPlan:
+    """
+    Compute which items block each item's path to the open face.
+    An item directly blocks another when it lies entirely in front of it
+    (closer to depth 0) and their width x height faces overlap. Items are
+    swept front to back; an item enters a 2D index of its face once the
+    sweep has passed its back, so each item's direct blockers are found
+    with one index query, and its full set is the union of theirs.
+    """
+    placed = [item for item in items if item["position"]]
+    boxes = {}
+    for item in placed:
+        start, end = item["position"]["start"], item["position"]["end"]
+        boxes[item["id"]] = (
+            (start["width"], start["depth"], start["height"]),
+            (end["width"], end["depth"], end["height"])
+        )
+    placed.sort(key=lambda item: boxes[item["id"]][0][1])
+
+    extent = max((max(box[1][0], box[1][2]) for box in boxes.values()), default=0)
+    faces = SpatialGrid(extent / GRID_CELLS_PER_AXIS or 1)
+    # (back depth, item_id) of items the sweep has not passed yet
+    pending: List[Tuple[float, str]] = []
+    closures: Dict[str, set] = {}
+    blockers: Dict[str, List[str]] = {}
+
+    for item in placed:
+        item_id = item["id"]
+        start, end = boxes[item_id]
+        while pending and pending[0][0] <= start[1]:
+            _, passed_id = heapq.heappop(pending)
+            faces.insert(passed_id, face_box(boxes[passed_id]))
+
+        closure = set()
+        for blocker_id in faces.query_overlap(face_box(boxes[item_id])):
+            closure.add(blocker_id)
+            closure |= closures[blocker_id]
+        closures[item_id] = closure
+        # Front-most first: every blocker of an item lies in front of it
+        blockers[item_id] = sorted(closure, key=lambda other: (boxes[other][0][1], other))
+        heapq.heappush(pending, (end[1], item_id))
+
+    return RetrievalPlan({item["id"]: item for item in items}, blockers)
+
+def face_box(box):
+    """Project a box onto the open face, as a unit-depth box for the grid."""
+    start, end = box
+    return ((start[0], 0.0, start[2]), (end[0], 1.0, end[2]))
+
+class RetrievalCostCache:
+    """
+    Per-container retrieval plans, rebuilt only for a container whose
+    contents changed. Each plan is stored with the container's version
+    from `load_versions`; a container without a version (no change
+    tracking available) is recomputed on every request.
+    """
+
+    def __init__(
+        self,
+        load_items: Callable[[Any, List[str]], Dict[str, List[Mapping[str, Any]]]],
+        load_versions: Callable[[Any, List[str]], Dict[str, Optional[int]]]
+    ):
+        self.load_items = load_items
+        self.load_versions = load_versions
+        self._plans: Dict[str, Tuple[int, RetrievalPlan]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, db, container_id: str) -> RetrievalPlan:
+        """
+        Get the retrieval plan of a container.
+        """
+        return self.get_many(db, [container_id])[container_id]
+
+    def get_many(self, db, container_ids: List[str]) -> Dict[str, RetrievalPlan]:
+        """
+        Get the retrieval plans of several containers, checking their
+        versions in one query and loading the stale ones in another.
+        """
+        versions = self.load_versions(db, container_ids)
+        plans = {}
+        stale = []
+        for container_id in dict.fromkeys(container_ids):
+            cached = self._plans.get(container_id)
+            version = versions[container_id]
+            if version is not None and cached is not None and cached[0] == version:
+                plans[container_id] = cached[1]
+            else:
+                stale.append(container_id)
+
+        if stale:
+            items = self.load_items(db, stale)
+            with self._lock:
+                for container_id in stale:
+                    plan = plans[container_id] = build_retrieval_plan(items[container_id])
+                    if versions[container_id] is not None:
+                        self._plans[container_id] = (versions[container_id], plan)
+        return plans
+
+    def invalidate(self, container_id: Optional[str] = None) -> None:
+        """
+        Drop the plan of one container, or of all containers.
+        """
+        with self._lock:
+            if container_id is None:
+                self._plans.clear()
+            else:
+                self._plans.pop(container_id, None)
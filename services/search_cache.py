@@ -0,0 +1,219 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+from data.database import get_container_versions
+
+# Search responses kept per worker, and how long one may be served before it
+# is recomputed when container versions are unavailable (changes made by
+# other workers are then only seen after that)
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "1000"))
+SEARCH_CACHE_TTL_MS = int(os.getenv("SEARCH_CACHE_TTL_MS", "30000"))
+
+class _Flight:
+    """
+    A computation in progress that identical requests wait on.
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+class SearchCache:
+    """
+    LRU cache of search responses with per-container invalidation.
+    Each entry remembers the containers its result was computed from and
+    their versions from `load_versions`, so a change to a container, made by
+    this worker or any other, only drops the searches that looked at it.
+    Entries whose containers have no version (no change tracking available)
+    expire after `ttl_ms` instead.
+    Concurrent misses for the same key are coalesced: one caller computes
+    and the others wait for its result.
+    """
+
+    def __init__(
+        self,
+        load_versions: Callable[[Any, List[str]], Dict[str, Optional[int]]],
+        max_entries: int = 1000,
+        ttl_ms: int = 30000
+    ):
+        self.load_versions = load_versions
+        self.max_entries = max_entries
+        self.ttl = ttl_ms / 1000
+        # key -> (expires_at, container versions, value), least recently used first
+        self._entries: "OrderedDict[Hashable, Tuple[float, Dict[str, Optional[int]], Any]]" = OrderedDict()
+        self._by_container: Dict[str, Set[Hashable]] = {}
+        self._flights: Dict[Hashable, _Flight] = {}
+        # Bumped by every invalidation; a result computed across one is not stored
+        self._epoch = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, db, key: Hashable) -> Any:
+        """
+        Get the cached value for `key`, or None without computing it.
+        """
+        return self.get_many(db, [key]).get(key)
+
+    def get_many(self, db, keys: Iterable[Hashable]) -> Dict[Hashable, Any]:
+        """
+        Get the cached values of several keys, checking the versions of
+        every container they depend on in one query. Keys that are missing
+        or stale are left out.
+        """
+        with self._lock:
+            entries = {key: self._entries[key] for key in keys if key in self._entries}
+        tracked = {
+            container_id
+            for _, versions, _ in entries.values() if is_tracked(versions)
+            for container_id in versions
+        }
+        current = self.load_versions(db, list(tracked)) if tracked else {}
+        
+        now = time.monotonic()
+        values = {}
+        with self._lock:
+            for key, entry in entries.items():
+                if self._entries.get(key) is not entry:
+                    # Invalidated or replaced while the versions were read
+                    continue
+                expires_at, versions, value = entry
+                if is_tracked(versions):
+                    fresh = all(current.get(container_id) == version for container_id, version in versions.items())
+                else:
+                    fresh = expires_at > now
+                if fresh:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    values[key] = value
+                else:
+                    self._remove(key)
+                    if is_tracked(versions):
+                        self.invalidations += 1
+        return values
+
+    def get_or_compute(
+        self,
+        db,
+        key: Hashable,
+        compute: Callable[[], Tuple[Any, Iterable[str]]],
+        versions: Optional[Dict[str, Optional[int]]] = None
+    ) -> Any:
+        """
+        Get the cached value for `key`, or compute it.
+        `compute` returns the value and the ids of the containers it depends
+        on; a value depending on no container is not cached. `versions` may
+        hold container versions already read for this request; the ones it
+        lacks are read after computing.
+        """
+        cached = self.get_many(db, [key])
+        if key in cached:
+            return cached[key]
+        
+        leader = False
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                self.coalesced += 1
+            else:
+                self.misses += 1
+                flight = self._flights[key] = _Flight()
+                leader = True
+                epoch = self._epoch
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            value, container_ids = compute()
+            container_ids = list(dict.fromkeys(container_ids))
+            known = versions or {}
+            unknown = [container_id for container_id in container_ids if container_id not in known]
+            loaded = self.load_versions(db, unknown) if unknown else {}
+            flight.value = value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+                if flight.error is None and epoch == self._epoch:
+                    self._store(key, {
+                        container_id: known[container_id] if container_id in known else loaded[container_id]
+                        for container_id in container_ids
+                    }, value)
+            flight.done.set()
+        return value
+
+    def invalidate(self, *container_ids: Optional[str]) -> None:
+        """
+        Drop every cached search that depends on one of the containers.
+        """
+        with self._lock:
+            self._epoch += 1
+            for container_id in container_ids:
+                for key in self._by_container.pop(container_id, ()):
+                    if key in self._entries:
+                        self._remove(key)
+                        self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+            self._by_container.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Cache size and hit, miss, coalescing, eviction and invalidation counters.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "size": len(self._entries),
+                "maxEntries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "hitRate": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations
+            }
+
+    def _store(self, key: Hashable, versions: Dict[str, Optional[int]], value: Any) -> None:
+        if not versions or self.max_entries <= 0:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (time.monotonic() + self.ttl, versions, value)
+        for container_id in versions:
+            self._by_container.setdefault(container_id, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _remove(self, key: Hashable) -> None:
+        _, versions, _ = self._entries.pop(key)
+        for container_id in versions:
+            keys = self._by_container.get(container_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_container[container_id]
+
+def is_tracked(versions: Dict[str, Optional[int]]) -> bool:
+    """
+    Whether every container an entry depends on has a version to check.
+    """
+    return all(version is not None for version in versions.values())
+
+search_cache = SearchCache(get_container_versions, SEARCH_CACHE_SIZE, SEARCH_CACHE_TTL_MS)
@@ -1,6 +1,6 @@
 from datetime import datetime
 from sqlalchemy.orm import Session
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 
 from models.search_model import (
     SearchResponse, 
@@ -11,9 +11,34 @@ from models.search_model import (
     RetrieveRequest, 
     RetrieveResponse, 
     PlaceRequest, 
-    PlaceResponse
+    PlaceResponse,
+    RegionSearchRequest,
+    RegionSearchResponse,
+    BatchSearchRequest,
+    BatchSearchResult,
+    BatchSearchResponse
 )
-from data.database import get_item_by_id, get_items_by_name, log_action, update_item_position
+from data.database import (
+    get_item_by_id,
+    get_container_by_id,
+    get_container_stats,
+    get_container_versions,
+    get_items_by_containers,
+    get_items_by_ids,
+    get_items_by_names,
+    get_items_by_name,
+    get_items_in_region,
+    update_item_usage,
+    log_action,
+    log_actions,
+    update_item_position
+)
+from services.placement_logic import record_item_position
+from services.retrieval_cost import RetrievalCostCache, RetrievalPlan
+from services.search_cache import search_cache
+
+# Blocking items and retrieval cost per item, rebuilt per container when its contents change
+retrieval_costs = RetrievalCostCache(get_items_by_containers, get_container_versions)
 
 def search_item(
     db: Session, 
@@ -31,6 +56,83 @@ def search_item(
     if user_id:
         log_action(db, "search", user_id, item_id or "unknown", item_name or "unknown")
     
+    # Repeated searches are served from the cache until a container they looked at changes
+    return search_cache.get_or_compute(
+        db,
+        search_cache_key(item_id, item_name),
+        lambda: find_item_for_retrieval(db, item_id, item_name)
+    )
+
+def search_items_batch(db: Session, request: BatchSearchRequest) -> BatchSearchResponse:
+    """
+    Search for many items by ID and by name at once.
+    Searches missing from the cache are resolved with one query for all IDs
+    and one full-text query for all names; containers are analysed once
+    for the whole batch and the searches are logged in one write.
+    """
+    queries = [(item_id, None) for item_id in request.itemIds] + [(None, name) for name in request.itemNames]
+    
+    if request.userId:
+        log_actions(db, [
+            {
+                "action_type": "search",
+                "user_id": request.userId,
+                "item_id": item_id or "unknown",
+                "item_name": item_name or "unknown"
+            }
+            for item_id, item_name in queries
+        ])
+    
+    # One version check for every cached search in the batch
+    cached = search_cache.get_many(db, [search_cache_key(item_id, item_name) for item_id, item_name in queries])
+    
+    missing = [(item_id, item_name) for item_id, item_name in queries if search_cache_key(item_id, item_name) not in cached]
+    items_by_id = get_items_by_ids(db, [item_id for item_id, _ in missing if item_id])
+    items_by_name = get_items_by_names(db, list(dict.fromkeys(item_name for _, item_name in missing if item_name)))
+    # ... and one version read for every container the computed searches depend on
+    versions = get_container_versions(db, list({
+        item["container_id"]
+        for items in [list(items_by_id.values()), *items_by_name.values()]
+        for item in items if item["container_id"]
+    }))
+    
+    plans = {}
+    results = []
+    for item_id, item_name in queries:
+        key = search_cache_key(item_id, item_name)
+        response = cached.get(key)
+        if response is None:
+            if item_id:
+                items = [items_by_id[item_id]] if item_id in items_by_id else []
+            else:
+                items = items_by_name.get(item_name, [])
+            response = search_cache.get_or_compute(db, key, lambda: build_search_response(db, items, plans), versions)
+        results.append(BatchSearchResult(itemId=item_id, itemName=item_name, result=response))
+    
+    return BatchSearchResponse(success=True, results=results)
+
+def search_cache_key(item_id: Optional[str], item_name: Optional[str]) -> Tuple[str, str]:
+    """
+    Cache key of a search: the item ID, else the normalized name.
+    """
+    if item_id:
+        return ("id", item_id)
+    return ("name", normalize_item_name(item_name))
+
+def normalize_item_name(item_name: str) -> str:
+    """
+    Normalize a searched name so differently typed spellings share a cache entry.
+    """
+    return " ".join(item_name.split()).casefold()
+
+def find_item_for_retrieval(
+    db: Session,
+    item_id: Optional[str],
+    item_name: Optional[str]
+) -> Tuple[SearchResponse, List[str]]:
+    """
+    Run a search. Returns the response and the containers it depends on.
+    """
     # Find the item(s)
     items = []
     if item_id:
@@ -40,18 +142,29 @@ def search_item(
     elif item_name:
         items = get_items_by_name(db, item_name)
     
+    return build_search_response(db, items)
+
+def build_search_response(
+    db: Session,
+    items: List[Dict[str, Any]],
+    plans: Optional[Dict[str, RetrievalPlan]] = None
+) -> Tuple[SearchResponse, List[str]]:
+    """
+    Pick the best of the matching items and describe how to retrieve it.
+    Returns the response and the containers it depends on.
+    """
     if not items:
         return SearchResponse(
             success=True,
             found=False,
             message=f"No items found matching the criteria"
-        )
+        ), []
     
     # Select the optimal item based on retrieval ease and expiry date
-    selected_item = select_optimal_item(items)
+    selected_item = select_optimal_item(db, items, plans)
     
     # Generate retrieval steps
-    retrieval_steps = generate_retrieval_steps(db, selected_item)
+    retrieval_steps = generate_retrieval_steps(db, selected_item, plans)
     
     # Create response
     item_detail = ItemDetail(
@@ -78,9 +191,44 @@ def search_item(
         found=True,
         item=item_detail,
         retrievalSteps=retrieval_steps
+    ), [item["container_id"] for item in items if item["container_id"]]
+
+def search_region(db: Session, request: RegionSearchRequest) -> RegionSearchResponse:
+    """
+    Find the items occupying any part of a box inside a container.
+    """
+    start = request.startCoordinates
+    end = request.endCoordinates
+    if start.width > end.width or start.depth > end.depth or start.height > end.height:
+        return RegionSearchResponse(
+            success=False,
+            message="startCoordinates must not exceed endCoordinates"
+        )
+    
+    items = get_items_in_region(db, request.containerId, start.dict(), end.dict())
+    
+    return RegionSearchResponse(
+        success=True,
+        items=[
+            ItemDetail(
+                itemId=item["id"],
+                name=item["name"],
+                containerId=item["container_id"],
+                zone=item["zone"],
+                position=Position(
+                    startCoordinates=Coordinates(**item["position"]["start"]),
+                    endCoordinates=Coordinates(**item["position"]["end"])
+                )
+            )
+            for item in items
+        ]
     )
 
-def select_optimal_item(items: List[Dict[str, Any]]) -> Dict[str, Any]:
+def select_optimal_item(
+    db: Session,
+    items: List[Dict[str, Any]],
+    plans: Optional[Dict[str, RetrievalPlan]] = None
+) -> Dict[str, Any]:
     """
     Select the optimal item from a list based on:
     1. Ease of retrieval (fewer items to move)
@@ -89,24 +237,52 @@ def select_optimal_item(items: List[Dict[str, Any]]) -> Dict[str, Any]:
     if len(items) == 1:
         return items[0]
     
-    # Sort by expiry date (ascending) and then by retrieval complexity (ascending)
+    # Sort by retrieval complexity (ascending) and then by expiry date (ascending)
     sorted_items = sorted(
         items,
         key=lambda x: (
-            x.get("expiry_date", datetime.max),  # Items closer to expiry first
-            x.get("retrieval_complexity", 100)   # Items easier to retrieve first
+            get_retrieval_cost(db, x, plans),   # Items easier to retrieve first
+            x.get("expiry_date") or datetime.max  # Items closer to expiry first
         )
     )
     
     return sorted_items[0]
 
-def generate_retrieval_steps(db: Session, item: Dict[str, Any]) -> List[RetrievalStep]:
+def get_retrieval_cost(db: Session, item: Dict[str, Any], plans: Optional[Dict[str, RetrievalPlan]] = None) -> int:
+    """
+    Number of items that have to be moved to take out an item.
+    """
+    if not item["container_id"]:
+        return 0
+    return get_retrieval_plan(db, item["container_id"], plans).cost(item["id"])
+
+def get_retrieval_plans(db: Session, container_ids: List[str]) -> Dict[str, RetrievalPlan]:
+    """
+    Get the retrieval plans of several containers with a fixed number of queries.
+    """
+    return retrieval_costs.get_many(db, container_ids)
+
+def get_retrieval_plan(db: Session, container_id: str, plans: Optional[Dict[str, RetrievalPlan]] = None) -> RetrievalPlan:
+    """
+    Get a container's retrieval plan, reusing one already fetched into `plans`.
+    """
+    if plans is None:
+        return retrieval_costs.get(db, container_id)
+    if container_id not in plans:
+        plans[container_id] = retrieval_costs.get(db, container_id)
+    return plans[container_id]
+
+def generate_retrieval_steps(
+    db: Session,
+    item: Dict[str, Any],
+    plans: Optional[Dict[str, RetrievalPlan]] = None
+) -> List[RetrievalStep]:
     """
     Generate step-by-step instructions for retrieving an item
     while minimizing movement of other items.
     """
     # Get items that need to be moved to access the target item
-    items_to_move = get_blocking_items(db, item)
+    items_to_move = get_blocking_items(db, item, plans)
     
     steps = []
     step_counter = 1
@@ -148,66 +324,18 @@ def generate_retrieval_steps(db: Session, item: Dict[str, Any]) -> List[Retrieva
     
     return steps
 
-def get_blocking_items(db: Session, target_item: Dict[str, Any]) -> List[Dict[str, Any]]:
-    """
-    Identify items that need to be moved to access the target item.
-    This is a simplified implementation - in a real system, this would use
-    spatial algorithms to determine which items are blocking access.
-    """
-    # Simplified implementation - in a real system, this would be more complex
-    container_id = target_item["container_id"]
-    target_position = target_item["position"]
-    
-    # Get all items in the same container
-    container_items = get_items_by_container(db, container_id)
-    
-    # Filter out the target item
-    container_items = [item for item in container_items if item["id"] != target_item["id"]]
-    
-    # Determine which items are blocking access
-    # This is a simplified algorithm - in reality, you'd need more complex spatial reasoning
-    blocking_items = []
-    for item in container_items:
-        if is_blocking(item["position"], target_position):
-            blocking_items.append(item)
-    
-    # Sort blocking items by the order they need to be moved
-    # (items on top or in front need to be moved first)
-    blocking_items.sort(key=lambda x: get_blocking_priority(x["position"], target_position))
-    
-    return blocking_items
-
-def is_blocking(item_position: Dict[str, Any], target_position: Dict[str, Any]) -> bool:
+def get_blocking_items(
+    db: Session,
+    target_item: Dict[str, Any],
+    plans: Optional[Dict[str, RetrievalPlan]] = None
+) -> List[Dict[str, Any]]:
     """
-    Determine if an item is blocking access to the target item.
-    This is a simplified implementation.
+    Identify items that need to be moved to access the target item,
+    in the order they have to be set aside (front-most first).
     """
-    # Simplified check - in reality, this would be more complex
-    # Check if item is directly in front of or on top of the target
-    if (item_position["start"]["height"] >= target_position["end"]["height"] and
-        item_position["start"]["width"] <= target_position["end"]["width"] and
-        item_position["end"]["width"] >= target_position["start"]["width"] and
-        item_position["start"]["depth"] <= target_position["end"]["depth"] and
-        item_position["end"]["depth"] >= target_position["start"]["depth"]):
-        return True
-    return False
-
-def get_blocking_priority(item_position: Dict[str, Any], target_position: Dict[str, Any]) -> int:
-    """
-    Calculate a priority value for blocking items.
-    Items with higher priority need to be moved first.
-    """
-    # Simplified priority calculation - in reality, this would be more complex
-    # Higher height means the item is on top and should be moved first
-    return item_position["start"]["height"]
-
-def get_items_by_container(db: Session, container_id: str) -> List[Dict[str, Any]]:
-    """
-    Get all items in a specific container.
-    """
-    # This would be implemented to query the database
-    # Simplified implementation for now
-    return []
+    if not target_item["container_id"]:
+        return []
+    return get_retrieval_plan(db, target_item["container_id"], plans).blocking_items(target_item["id"])
 
 def retrieve_item(db: Session, request: RetrieveRequest) -> RetrieveResponse:
     """
@@ -227,6 +355,10 @@ def retrieve_item(db: Session, request: RetrieveRequest) -> RetrieveResponse:
         # Update item usage count
         update_item_usage(db, request.itemId)
         
+        item = get_item_by_id(db, request.itemId)
+        if item:
+            search_cache.invalidate(item["container_id"])
+        
         return RetrieveResponse(success=True)
     except Exception as e:
         return RetrieveResponse(success=False, message=str(e))
@@ -236,6 +368,27 @@ def place_item(db: Session, request: PlaceRequest) -> PlaceResponse:
     Log that an item has been placed back into storage.
     """
     try:
+        start, end = request.position.startCoordinates, request.position.endCoordinates
+        if start.width > end.width or start.depth > end.depth or start.height > end.height:
+            return PlaceResponse(
+                success=False,
+                message="startCoordinates must not exceed endCoordinates"
+            )
+        
+        item = get_item_by_id(db, request.itemId)
+        
+        # Enforce the container's weight limit from its running totals
+        container = get_container_by_id(db, request.containerId)
+        if item and container and container.get("max_weight"):
+            used_weight = get_container_stats(db, request.containerId)["used_weight"]
+            if item["container_id"] == request.containerId:
+                used_weight -= item["weight"] or 0.0
+            if used_weight + (item["weight"] or 0.0) > container["max_weight"]:
+                return PlaceResponse(
+                    success=False,
+                    message=f"Container {request.containerId} would exceed its weight limit"
+                )
+        
         # Log the placement action
         log_action(
             db, 
@@ -267,15 +420,16 @@ def place_item(db: Session, request: PlaceRequest) -> PlaceResponse:
             position
         )
         
+        # Keep the placement engine's free-space model in step
+        record_item_position(
+            request.itemId,
+            request.containerId,
+            position,
+            item["weight"] if item else 0.0
+        )
+        search_cache.invalidate(request.containerId, item["container_id"] if item else None)
+        
         return PlaceResponse(success=True)
     except Exception as e:
         return PlaceResponse(success=False, message=str(e))
 
-def update_item_usage(db: Session, item_id: str) -> None:
-    """
-    Update the usage count of an item.
-    """
-    # This would be implemented to update the database
-    # Simplified implementation for now
-    pass
-
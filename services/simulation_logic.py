@@ -1,95 +1,70 @@
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from sqlalchemy.orm import Session
-from typing import List, Dict, Any, Optional
-from models.simulation_model import SimulationRequest, SimulationResponse, SimulationChanges, ItemUsage
-from data.database import get_all_items, update_item_usage, log_action, get_item_by_id, get_item_by_name
+from typing import List, Dict, Any, Tuple
+
+import numpy as np
+
+from models.simulation_model import SimulationRequest, SimulationResponse, SimulationChanges, SimulationDay, ItemUsage
+from data.database import (
+    get_items_expiring,
+    get_items_by_ids,
+    get_items_by_exact_names,
+    increment_item_usages,
+    log_action,
+    ITEM_USAGE_COLUMNS
+)
+
+DAY = timedelta(days=1)
 
 def simulate_day(db: Session, request: SimulationRequest) -> SimulationResponse:
     """
     Simulate daily item usage based on the provided request.
     Track changes such as items used, expired, and depleted.
+    Every listed item is used once per simulated day (once per listing)
+    until it runs out of uses or expires; all the uses are written back in
+    one bulk update.
     """
     current_date = datetime.utcnow()
-    items_used = []
-    items_expired = []
-    items_depleted = []
-
-    # Process items to be used per day
-    for item in request.itemsToBeUsedPerDay:
-        item_id = item.itemId if hasattr(item, 'itemId') and item.itemId else None
-        item_name = item.name if hasattr(item, 'name') and item.name else None
-        
-        # Fetch item details from the database
-        item_details = get_item_by_id(db, item_id) if item_id else get_item_by_name(db, item_name)
-        
-        if item_details:
-            # Update item usage
-            update_item_usage(db, item_details['id'])
-            
-            # Add to items used
-            remaining_uses = item_details.get('max_uses', 0) - item_details.get('usage_count', 0)
-            items_used.append(
-                ItemUsage(
-                    itemId=item_details['id'],
-                    name=item_details['name'],
-                    remainingUses=remaining_uses
-                )
-            )
-            
-            # Check for expiration
-            if item_details.get('expiry_date') and item_details['expiry_date'] < current_date:
-                items_expired.append(
-                    ItemUsage(
-                        itemId=item_details['id'],
-                        name=item_details['name'],
-                        remainingUses=remaining_uses
-                    )
-                )
-            
-            # Check for depletion
-            if item_details.get('max_uses') and item_details.get('usage_count', 0) >= item_details['max_uses']:
-                items_depleted.append(
-                    ItemUsage(
-                        itemId=item_details['id'],
-                        name=item_details['name'],
-                        remainingUses=0
-                    )
-                )
-    
-    # Calculate new date
-    if request.numOfDays:
-        new_date = current_date + timedelta(days=request.numOfDays)
-    elif request.toTimestamp:
-        try:
-            new_date = datetime.fromisoformat(request.toTimestamp.replace('Z', '+00:00'))
-        except ValueError:
-            # If timestamp is invalid, use current time plus one day
-            new_date = current_date + timedelta(days=1)
-    else:
-        # Default to one day if neither is provided
-        new_date = current_date + timedelta(days=1)
-    
-    # Check for items that expire during the simulation period
-    all_items = get_all_items(db)
-    for item in all_items:
-        if item.get('expiry_date') and current_date < item['expiry_date'] <= new_date:
-            # Item expires during simulation period
-            if item['id'] not in [expired.itemId for expired in items_expired]:
-                items_expired.append(
-                    ItemUsage(
-                        itemId=item['id'],
-                        name=item['name'],
-                        remainingUses=item.get('max_uses', 0) - item.get('usage_count', 0)
-                    )
-                )
-    
+    new_date, num_days = get_simulation_end(current_date, request)
+
+    # Resolve the items to use, counting repeated listings
+    items = resolve_items(db, request.itemsToBeUsedPerDay)
+    used_items = list({item["id"]: item for item in items}.values())
+    per_day = count_listings(items, [item["id"] for item in used_items])
+
+    usage = simulate_usage(used_items, per_day, current_date, num_days)
+    increment_item_usages(db, {item["id"]: int(uses) for item, uses in zip(used_items, usage["uses"]) if uses > 0})
+
+    items_used = [
+        ItemUsage(itemId=item["id"], name=item["name"], remainingUses=int(remaining))
+        for item, uses, remaining in zip(used_items, usage["uses"], usage["remaining"])
+        if uses > 0
+    ]
+    items_depleted = [
+        ItemUsage(itemId=used_items[index]["id"], name=used_items[index]["name"], remainingUses=0)
+        for index in np.flatnonzero(usage["depleted_day"] > 0)
+    ]
+
+    # Listed items already expired, then everything expiring during the period
+    items_expired = [
+        ItemUsage(itemId=item["id"], name=item["name"], remainingUses=remaining_uses(item))
+        for item in used_items
+        if item["expiry_date"] and item["expiry_date"] < current_date
+    ]
+    expiring = get_items_expiring(db, current_date, new_date, ITEM_USAGE_COLUMNS)
+    seen = {item.itemId for item in items_expired}
+    items_expired.extend(
+        ItemUsage(itemId=item["id"], name=item["name"], remainingUses=remaining_uses(item))
+        for item in expiring if item["id"] not in seen
+    )
+
     # Create changes object
     changes = SimulationChanges(
         itemsUsed=items_used,
         itemsExpired=items_expired,
         itemsDepletedToday=items_depleted
     )
-    
+
     # Log the simulation action
     log_action(
         db,
@@ -98,10 +73,165 @@ def simulate_day(db: Session, request: SimulationRequest) -> SimulationResponse:
         "simulation",
         f"Simulated {request.numOfDays if request.numOfDays else 'to specific date'} days"
     )
-    
+
     return SimulationResponse(
         success=True,
         newDate=new_date.isoformat(),
-        changes=changes
+        changes=changes,
+        dailyChanges=build_daily_changes(current_date, num_days, used_items, usage, expiring)
     )
 
+def get_simulation_end(current_date: datetime, request: SimulationRequest) -> Tuple[datetime, int]:
+    """
+    End of the simulated period and the number of days it spans.
+    """
+    if request.numOfDays:
+        num_days = max(0, request.numOfDays)
+        return current_date + timedelta(days=num_days), num_days
+
+    new_date = None
+    if request.toTimestamp:
+        try:
+            new_date = datetime.fromisoformat(request.toTimestamp.replace('Z', '+00:00'))
+        except ValueError:
+            # If timestamp is invalid, use current time plus one day
+            pass
+    if new_date is None:
+        # Default to one day if neither is provided
+        return current_date + DAY, 1
+
+    if new_date.tzinfo is not None:
+        # Stored dates are naive UTC
+        new_date = new_date.astimezone(timezone.utc).replace(tzinfo=None)
+    return new_date, max(0, -(-(new_date - current_date) // DAY))
+
+def resolve_items(db: Session, requested: List[Any]) -> List[Dict[str, Any]]:
+    """
+    Look up the listed items by ID, else by exact name, in two queries.
+    Listings that match no item are dropped; repeated ones are kept.
+    """
+    keys = []
+    for item in requested:
+        if isinstance(item, dict):
+            item_id, item_name = item.get("itemId"), item.get("name")
+        else:
+            item_id, item_name = item.itemId, item.name
+        keys.append((item_id or None, item_name or None))
+
+    by_id = get_items_by_ids(db, [item_id for item_id, _ in keys if item_id], ITEM_USAGE_COLUMNS)
+    by_name = get_items_by_exact_names(
+        db, [item_name for item_id, item_name in keys if not item_id and item_name], ITEM_USAGE_COLUMNS
+    )
+
+    items = []
+    for item_id, item_name in keys:
+        item = by_id.get(item_id) if item_id else by_name.get(item_name)
+        if item:
+            items.append(item)
+    return items
+
+def count_listings(items: List[Dict[str, Any]], item_ids: List[str]) -> np.ndarray:
+    """
+    How many times each of `item_ids` appears in `items`.
+    """
+    positions = {item_id: index for index, item_id in enumerate(item_ids)}
+    return np.bincount(
+        np.fromiter((positions[item["id"]] for item in items), dtype=np.int64, count=len(items)),
+        minlength=len(item_ids)
+    )
+
+def simulate_usage(
+    items: List[Dict[str, Any]],
+    per_day: np.ndarray,
+    start: datetime,
+    num_days: int
+) -> Dict[str, np.ndarray]:
+    """
+    Advance the use of `items` over `num_days` days in closed form.
+    Item i is used `per_day[i]` times on each day that starts before its
+    expiry, until its uses run out. Returns, per item, the uses made
+    ("uses"), the uses left ("remaining", 0 for unlimited items), the last
+    day with full use ("full_days"), the uses on the day after it
+    ("partial") and the day it ran out of uses ("depleted_day", 0 if not).
+    """
+    count = len(items)
+    num_days = max(0, num_days)
+    usage_count = np.fromiter((item["usage_count"] or 0 for item in items), dtype=np.int64, count=count)
+    max_uses = np.fromiter((item["max_uses"] or 0 for item in items), dtype=np.int64, count=count)
+    expiry = np.array([item["expiry_date"] for item in items], dtype="datetime64[us]")
+
+    limited = max_uses > 0
+    left = np.where(limited, np.maximum(max_uses - usage_count, 0), np.iinfo(np.int64).max)
+
+    # Day d starts at start + (d - 1) days, so an item can be used on the
+    # first ceil((expiry - start) / 1 day) days
+    until_expiry = (expiry - np.datetime64(start, "us")) / np.timedelta64(1, "D")
+    usable_days = np.where(
+        np.isnat(expiry), num_days, np.clip(np.ceil(np.nan_to_num(until_expiry, nan=0.0)), 0, num_days)
+    ).astype(np.int64)
+
+    # Full days at per_day uses, then what is left on the next one
+    per_day = np.maximum(per_day, 1)
+    full_days = np.minimum(usable_days, left // per_day)
+    partial = np.where(full_days < usable_days, np.minimum(left - full_days * per_day, per_day), 0)
+    uses = full_days * per_day + partial
+
+    depleted_day = np.where(
+        limited & (left > 0) & (uses == left),
+        full_days + (partial > 0),
+        0
+    )
+    return {
+        "uses": uses,
+        "remaining": np.where(limited, left - uses, 0),
+        "full_days": full_days,
+        "partial": partial,
+        "per_day": per_day,
+        "depleted_day": depleted_day
+    }
+
+def build_daily_changes(
+    start: datetime,
+    num_days: int,
+    items: List[Dict[str, Any]],
+    usage: Dict[str, np.ndarray],
+    expiring: List[Dict[str, Any]]
+) -> List[SimulationDay]:
+    """
+    Per-day totals: uses made, and the items that expired or ran out of uses that day.
+    """
+    if num_days <= 0:
+        return []
+
+    # Uses on day d: per_day from every item with at least d full days,
+    # plus the partial uses of items whose last day is d
+    full = np.bincount(usage["full_days"], weights=usage["per_day"], minlength=num_days + 2)
+    used_per_day = np.cumsum(full[::-1])[::-1][1:num_days + 1]
+    partial_day = usage["full_days"] + 1
+    with_partial = usage["partial"] > 0
+    used_per_day = used_per_day + np.bincount(
+        partial_day[with_partial], weights=usage["partial"][with_partial], minlength=num_days + 2
+    )[1:num_days + 1]
+
+    depleted: Dict[int, List[str]] = {}
+    for index in np.flatnonzero(usage["depleted_day"] > 0):
+        depleted.setdefault(int(usage["depleted_day"][index]), []).append(items[index]["id"])
+
+    expired: Dict[int, List[str]] = {}
+    for item in expiring:
+        day = max(1, -(-(item["expiry_date"] - start) // DAY))
+        expired.setdefault(min(day, num_days), []).append(item["id"])
+
+    return [
+        SimulationDay(
+            day=day,
+            date=(start + day * DAY).isoformat(),
+            itemsUsed=int(used_per_day[day - 1]),
+            itemsExpired=expired.get(day, []),
+            itemsDepleted=depleted.get(day, [])
+        )
+        for day in range(1, num_days + 1)
+    ]
+
+def remaining_uses(item: Dict[str, Any]) -> int:
+    return max((item["max_uses"] or 0) - (item["usage_count"] or 0), 0)
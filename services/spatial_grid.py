@@ -0,0 +1,100 @@
+from math import floor
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+# Axis-aligned box as ((min_w, min_d, min_h), (max_w, max_d, max_h))
+Box = Tuple[Tuple[float, float, float], Tuple[float, float, float]]
+Cell = Tuple[int, int, int]
+
+def boxes_overlap(box1: Box, box2: Box) -> bool:
+    """
+    Check if two boxes overlap with non-zero volume (touching faces do not count).
+    """
+    (start1, end1), (start2, end2) = box1, box2
+    return (
+        start1[0] < end2[0] and start2[0] < end1[0] and
+        start1[1] < end2[1] and start2[1] < end1[1] and
+        start1[2] < end2[2] and start2[2] < end1[2]
+    )
+
+class SpatialGrid:
+    """
+    Uniform 3D grid of bucketed boxes for one container.
+    Each box is registered in every cell it covers, so an overlap query only
+    compares against boxes sharing a cell with it instead of every box in
+    the container. Insert, delete and query cost is proportional to the
+    number of cells a box spans plus the items found there.
+    """
+
+    def __init__(self, cell_size: float):
+        if cell_size <= 0:
+            raise ValueError("cell_size must be positive")
+        self.cell_size = cell_size
+        self.cells: Dict[Cell, Set[str]] = {}
+        self.boxes: Dict[str, Box] = {}
+
+    def __len__(self) -> int:
+        return len(self.boxes)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.boxes
+
+    def insert(self, key: str, box: Box) -> None:
+        """
+        Add a box under `key`, replacing any box already stored for it.
+        """
+        if key in self.boxes:
+            self.delete(key)
+        self.boxes[key] = box
+        for cell in self._cells_for(box):
+            self.cells.setdefault(cell, set()).add(key)
+
+    def delete(self, key: str) -> bool:
+        """
+        Remove the box stored under `key`. Returns False if there was none.
+        """
+        box = self.boxes.pop(key, None)
+        if box is None:
+            return False
+        for cell in self._cells_for(box):
+            bucket = self.cells.get(cell)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self.cells[cell]
+        return True
+
+    def query_overlap(self, box: Box, exclude: Optional[str] = None) -> List[str]:
+        """
+        Get the keys of all stored boxes overlapping `box`.
+        """
+        found = set()
+        for cell in self._cells_for(box):
+            for key in self.cells.get(cell, ()):
+                if key != exclude and key not in found and boxes_overlap(self.boxes[key], box):
+                    found.add(key)
+        return list(found)
+
+    def any_overlap(self, box: Box, exclude: Optional[str] = None) -> bool:
+        """
+        Check whether any stored box overlaps `box`, stopping at the first hit.
+        """
+        checked = set()
+        for cell in self._cells_for(box):
+            for key in self.cells.get(cell, ()):
+                if key == exclude or key in checked:
+                    continue
+                if boxes_overlap(self.boxes[key], box):
+                    return True
+                checked.add(key)
+        return False
+
+    def _cells_for(self, box: Box) -> Iterator[Cell]:
+        start, end = box
+        size = self.cell_size
+        low = [floor(value / size) for value in start]
+        # A box ending exactly on a cell boundary does not reach into the next cell
+        high = [max(low[axis], -floor(-end[axis] / size) - 1) for axis in range(3)]
+        for w in range(low[0], high[0] + 1):
+            for d in range(low[1], high[1] + 1):
+                for h in range(low[2], high[2] + 1):
+                    yield (w, d, h)
@@ -0,0 +1,49 @@
+import threading
+
+from services.placement_store import PlacementStore
+
+def container_entry(container_id):
+    return {"op": "container", "id": container_id, "meta": [10, 10, 10, None, 0.0], "items": []}
+
+def place_entry(item_id, container_id):
+    return {"op": "place", "item": item_id, "container": container_id, "box": [0, 0, 0, 1, 1, 1], "weight": 0.0}
+
+def stored_items(store, container_id):
+    return {item_id for item_id, _, _ in store.load().records(container_id)}
+
+def make_stores(tmp_path, count=2):
+    snapshot, wal = str(tmp_path / "placement.snapshot"), str(tmp_path / "placement.wal")
+    # Never compact on their own; the tests decide when
+    return [PlacementStore(snapshot, wal, compact_after=10 ** 9) for _ in range(count)]
+
+def test_compaction_keeps_every_entry(tmp_path):
+    first, second = make_stores(tmp_path)
+    first.append([container_entry("c")])
+    first.append([place_entry(f"a{index}", "c") for index in range(3)])
+    first.compact()
+    second.append([place_entry(f"b{index}", "c") for index in range(3)])
+    second.compact()
+    first.compact()
+
+    assert stored_items(first, "c") == {"a0", "a1", "a2", "b0", "b1", "b2"}
+
+def test_concurrent_appends_and_compactions_lose_nothing(tmp_path):
+    stores = make_stores(tmp_path, 4)
+    stores[0].append([container_entry("c")])
+
+    def work(worker, store):
+        for index in range(50):
+            store.append([place_entry(f"w{worker}-{index}", "c")])
+            if index % 5 == 0:
+                store.compact()
+
+    threads = [threading.Thread(target=work, args=(worker, store)) for worker, store in enumerate(stores)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    expected = {f"w{worker}-{index}" for worker in range(len(stores)) for index in range(50)}
+    assert stored_items(stores[0], "c") == expected
+    stores[0].compact()
+    assert stored_items(stores[0], "c") == expected